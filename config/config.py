@@ -5,10 +5,69 @@ class Config:
     # Text processing
     CHUNK_SIZE = 1000
     CHUNK_OVERLAP = 200
+    CHUNK_TOKENS = None           # Token budget per chunk (e.g. 256 for all-mpnet-base-v2, which truncates at 384); None splits by CHUNK_SIZE characters
+    CHUNK_TOKEN_OVERLAP = 32      # Tokens shared by consecutive chunks in token mode
+    CHUNK_TOKENIZER = "auto"      # "embedder", "tiktoken", "regex" (approximate) or "auto" (first that loads)
+    
+    # Ingestion pipeline (scrape -> clean/split -> embed -> index)
+    PIPELINE_QUEUE_SIZE = 8       # Items buffered between stages; bounds memory regardless of site size
+    EMBED_BATCH_SIZE = 64         # Chunks per embedding batch; embedding starts once a batch is ready
+    PROCESS_POOL_WORKERS = None   # Processes for clean/split (None = CPU count - 1, 0 = in-process only)
+    PROCESS_POOL_MIN_DOCUMENTS = 50  # Pages cleaned and split in-process before the pool is used
+    PROCESS_POOL_CHUNKSIZE = 8    # Pages per task sent to a worker process
+    BULK_CHECKPOINT_DOCUMENTS = 200  # Bulk ingestion saves the index and checkpoint this often...
+    BULK_CHECKPOINT_SECONDS = 300    # ...or after this many seconds, whichever comes first
+    
+    # Crawling
+    CRAWL_MAX_IN_FLIGHT = 8       # Concurrent requests across all hosts (1 crawls serially)
+    CRAWL_MAX_PER_HOST = 4        # Concurrent requests to any one host
+    CRAWL_POLITENESS_DELAY = 0.25 # Seconds between request starts to the same host
+    CRAWL_TIMEOUT = 10            # Per-request timeout in seconds
+    CRAWL_MAX_PAGE_BYTES = 5 * 1024 * 1024       # Decoded bytes kept per page; larger pages are truncated
+    CRAWL_MAX_SITEMAP_BYTES = 50 * 1024 * 1024   # Sitemap size limit from the sitemaps.org protocol
+    CRAWL_MAX_DEPTH = 2           # Links followed from the start page (breadth-first)
+    CRAWL_RESPECT_ROBOTS = True   # Skip URLs disallowed by robots.txt and honour Crawl-delay
+    CRAWL_USE_SITEMAP = True      # Seed the frontier from sitemap.xml when present
+    CRAWL_SITEMAP_MAX_URLS = 1000 # Sitemap URLs queued per crawl
+    CRAWL_SITEMAP_MAX_FILES = 10  # Sitemap / sitemap-index files read per crawl
+    HTTP_CACHE_PATH = os.path.join("data", "http_cache.sqlite3")  # None disables conditional re-crawls
+    HTTP_CACHE_MAX_ENTRIES = 20000  # Cached pages (least recently used are evicted)
+    HTML_EXTRACTOR = "auto"       # "html.parser", "lxml", "selectolax" or "auto" (fastest installed)
     
     # FAISS settings
     EMBEDDING_MODEL = "sentence-transformers/all-mpnet-base-v2"
+    EMBEDDING_DEVICE = "cpu"
+    WARMUP_ON_STARTUP = True   # Load the model and index on a background thread at app start
+    WARMUP_TIMEOUT = 300       # Seconds a request waits for the warm-up before loading directly
     FAISS_INDEX_PATH = os.path.join("data", "faiss_index")
+    MMAP_INDEX = True  # Memory-map the FAISS index on load (copied to RAM on first write)
+    SEGMENT_SMALL_ROWS = 5000       # Segments below this many chunks are merge candidates
+    SEGMENT_MERGE_THRESHOLD = 8     # Merge once this many small adjacent segments exist
+    SNAPSHOT_STALE_FRACTION = 0.1   # Rewrite the index snapshot once 10% of rows are outside it
+    COMPACTION_DEAD_FRACTION = 0.2  # Compact segments once 20% of saved chunks are deleted
+    QUERY_CACHE_SIZE = 256  # Max cached query embeddings per store (0 disables)
+    EMBEDDING_CACHE_PATH = os.path.join("data", "embedding_cache.sqlite3")  # None disables
+    EMBEDDING_CACHE_MAX_ENTRIES = 100000  # ~300 MB of 768-d float32 vectors
+    
+    # FAISS index type: "flat", "ivf_flat", "hnsw" or "ivf_pq"
+    INDEX_TYPE = "flat"
+    IVF_NLIST = 1024           # Number of IVF centroids
+    IVF_NPROBE = 16            # IVF lists visited per query
+    IVF_TRAIN_SIZE = None      # Vectors to buffer before training (default: 39 * nlist)
+    HNSW_M = 32                # HNSW graph neighbours per node
+    HNSW_EF_CONSTRUCTION = 200
+    HNSW_EF_SEARCH = 64
+    PQ_M = 48                  # PQ sub-quantizers (must divide the embedding dimension)
+    PQ_NBITS = 8
+    VECTOR_PRECISION = "float32"  # Index storage: "float32", "float16" (1/2 memory) or "int8" (1/4 memory)
+    SQ_TRAIN_SIZE = 1000       # Vectors buffered before training the int8 quantizer
+    RERANK_FACTOR = 4          # Re-score k * factor candidates with exact float32 vectors (0 disables)
+    
+    # Summary settings
+    SUMMARY_MODE = "textrank"  # "textrank" (most central chunks, ranked over their stored embeddings) or "lead" (first sentences of each page)
+    SUMMARY_MAX_PAGES = 20     # Pages, in crawl order, whose chunks are ranked (None = all; ranking cost grows with chunks squared)
+    SUMMARY_WORKERS = 4        # Threads summarizing pages and reduce groups concurrently (0 or 1 summarizes inline)
+    SUMMARY_FAN_IN = 8         # Summaries combined per reduce step; reduce depth grows with log(pages) / log(fan-in)
     
     # Model settings
     MODEL_NAME = "gpt-3.5-turbo"
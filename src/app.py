@@ -9,6 +9,13 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from ingestion.manual_ingestion import ManualIngestor
 from ingestion.automatic_ingestion import AutomaticIngestor
 from chatbot.rag_chatbot import RAGChatbot
+from vector_store.warmup import warmup
+from config.config import config
+
+# Load the embedding model and index in the background once per process;
+# Streamlit re-runs this script on every interaction, so later calls are no-ops
+if config.WARMUP_ON_STARTUP:
+    warmup.start(config.EMBEDDING_MODEL, config.EMBEDDING_DEVICE, config.FAISS_INDEX_PATH)
 
 # Enhanced Page configuration
 st.set_page_config(
@@ -306,6 +313,15 @@ def main():
                 if st.button("Reusable RAG Chatbot", key="nav_chatbot", use_container_width=True):
                     st.session_state.selected_tab = 2
                     st.rerun()
+        
+        # Startup status for monitoring cold starts
+        warmup_stats = warmup.stats()
+        if warmup_stats["state"] == "ready":
+            st.caption(f"Model ready (warm-up {warmup_stats['timings']['total']:.1f}s)")
+        elif warmup_stats["state"] == "warming":
+            st.caption("Loading embedding model in the background...")
+        elif warmup_stats["state"] == "failed":
+            st.caption(f"Model warm-up failed: {warmup_stats['error']}")
     
     # Main content area based on navigation selection
     st.markdown('<div style="background: rgba(228, 224, 225, 0.9); padding: 2rem; border-radius: 15px; border: 2px solid #AB886D; margin: 1rem 0;">', unsafe_allow_html=True)
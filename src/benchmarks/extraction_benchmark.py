@@ -0,0 +1,131 @@
+"""
+Throughput and memory report for the HTML extraction backends.
+
+Runs every installed backend (html.parser, lxml, selectolax) over the saved
+pages in benchmarks/fixtures/html plus a few generated encyclopedia-sized
+pages, and reports:
+
+    pages/s     - extraction throughput (decode, parse, strip, text, links)
+    MB/s        - the same in HTML bytes per second
+    peak KB     - mean peak Python allocation per page, from tracemalloc
+    identical   - pages whose text and links match html.parser
+
+Throughput is timed without tracemalloc; allocations are measured in a
+separate pass since tracing slows every allocation down. Allocations made
+inside C parsers (libxml2, lexbor) are not traced, so peak KB shows how
+much Python-level garbage each backend creates.
+
+Run from the src/ directory:
+    python -m benchmarks.extraction_benchmark --repeat 20
+"""
+import argparse
+import glob
+import sys
+import os
+import time
+import tracemalloc
+from typing import Dict, List
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from ingestion.html_extractors import available_extractors, decode_html, get_extractor
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "html")
+
+def load_fixtures() -> Dict[str, bytes]:
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        with open(path, "rb") as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+def large_page(sections: int, seed: int) -> bytes:
+    """An encyclopedia-style page: long navigation, infobox, many sections and references."""
+    nav = "".join(f'<li><a href="/wiki/Topic_{seed}_{i}">Topic {i}</a></li>' for i in range(300))
+    body = []
+    for section in range(sections):
+        body.append(f'<h2 id="s{section}">Section {section}</h2>')
+        for paragraph in range(4):
+            body.append(
+                f"<p>Paragraph {paragraph} of section {section} discusses the "
+                f'<a href="/wiki/Subject_{seed}_{section}_{paragraph}">subject</a> in detail, '
+                f"with <b>bold terms</b>, <i>italic asides</i> and a citation"
+                f'<sup><a href="#cite-{section}-{paragraph}">[{paragraph + 1}]</a></sup>. '
+                + "Further context follows in plain prose. " * 6
+                + "</p>"
+            )
+        body.append('<table class="wikitable">' + "".join(
+            f"<tr><td>Row {row}</td><td>{row * section}</td><td>&nbsp;</td></tr>" for row in range(10)
+        ) + "</table>")
+    references = "".join(f'<li id="cite-{i}"><a href="https://example.org/ref/{i}">Reference {i}</a></li>'
+                         for i in range(sections * 4))
+    html = (
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>Generated article</title>"
+        + "<style>" + ".x{color:red}" * 200 + "</style>"
+        + "<script>" + "var a = 1;" * 500 + "</script></head><body>"
+        + f'<header><nav><ul>{nav}</ul></nav></header>'
+        + '<div id="content" class="mw-body"><main><h1>Generated article</h1>'
+        + '<table class="infobox"><tr><th>Founded</th><td>1901</td></tr></table>'
+        + "".join(body)
+        + f'<ol class="references">{references}</ol></main></div>'
+        + "<footer>Text is available under a free licence.</footer></body></html>"
+    )
+    return html.encode("utf-8")
+
+def extract_all(extractor, pages: Dict[str, bytes]) -> Dict[str, tuple]:
+    """(whitespace-normalized text, hrefs) per page; the scraper collapses whitespace anyway."""
+    results = {}
+    for name, content in pages.items():
+        text, hrefs = extractor.extract(decode_html(content, "text/html"))
+        results[name] = (" ".join(text.split()), hrefs)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over the page set for the timing run")
+    parser.add_argument("--large-pages", type=int, default=3, help="Generated encyclopedia-sized pages to add")
+    parser.add_argument("--sections", type=int, default=60, help="Sections per generated page")
+    parser.add_argument("--backends", nargs="*", default=None, help="Backends to compare (default: all installed)")
+    args = parser.parse_args()
+
+    pages = load_fixtures()
+    for seed in range(args.large_pages):
+        pages[f"generated_{seed}.html"] = large_page(args.sections, seed)
+    total_bytes = sum(len(content) for content in pages.values())
+    backends: List[str] = args.backends or available_extractors()
+    print(f"{len(pages)} pages, {total_bytes / 1024:.0f} KB of HTML; backends: {', '.join(backends)}")
+
+    reference = extract_all(get_extractor("html.parser"), pages)
+
+    print(f"\n{'backend':<12} {'pages/s':>9} {'MB/s':>7} {'peak KB':>9} {'identical':>10}")
+    for backend in backends:
+        extractor = get_extractor(backend)
+        results = extract_all(extractor, pages)
+        identical = sum(results[name] == reference[name] for name in pages)
+
+        started = time.perf_counter()
+        for _ in range(args.repeat):
+            for content in pages.values():
+                extractor.extract(decode_html(content, "text/html"))
+        elapsed = time.perf_counter() - started
+        processed = args.repeat * len(pages)
+
+        peaks = []
+        tracemalloc.start()
+        for content in pages.values():
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            extractor.extract(decode_html(content, "text/html"))
+            peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+        tracemalloc.stop()
+
+        print(f"{backend:<12} {processed / elapsed:>9.1f} {args.repeat * total_bytes / elapsed / 1e6:>7.2f} "
+              f"{sum(peaks) / len(peaks) / 1024:>9.0f} {identical:>5}/{len(pages)}")
+        for name in pages:
+            if results[name] != reference[name]:
+                text, links = results[name]
+                print(f"    {name}: text {'differs' if text != reference[name][0] else 'matches'}, "
+                      f"links {'differ' if links != reference[name][1] else 'match'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Memory / startup benchmark for the shared embedding model registry.
+
+Simulates several Streamlit sessions, each owning a RAGChatbot plus its own
+ManualIngestor and AutomaticIngestor (as app.py does), and reports how many
+model copies end up resident and what the cold/warm load costs are.
+
+Run from the src/ directory:
+    python -m benchmarks.model_registry_benchmark --sessions 4
+"""
+import argparse
+import resource
+import sys
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot.rag_chatbot import RAGChatbot
+from ingestion.manual_ingestion import ManualIngestor
+from ingestion.automatic_ingestion import AutomaticIngestor
+from vector_store.model_registry import model_registry
+
+def current_rss_mb() -> float:
+    """Current resident set size in MB (falls back to peak RSS off Linux)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def simulate_session(_):
+    """Build the objects one Streamlit session holds and force their models to load."""
+    start = time.perf_counter()
+    chatbot = RAGChatbot()
+    manual = ManualIngestor()
+    auto = AutomaticIngestor()
+
+    stores = [
+        chatbot.manual_ingestor._get_components()[2],
+        chatbot.auto_ingestor._get_components()[4],
+        manual._get_components()[2],
+        auto._get_components()[4],
+    ]
+    models = [store._get_model() for store in stores]
+    return time.perf_counter() - start, models
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=4, help="Number of concurrent sessions to simulate")
+    args = parser.parse_args()
+
+    baseline_rss = current_rss_mb()
+    print(f"Baseline RSS: {baseline_rss:.1f} MB")
+
+    # Cold session: pays for the one and only model load
+    cold_seconds, _ = simulate_session(0)
+    after_cold_rss = current_rss_mb()
+
+    # Remaining sessions in parallel: must all reuse the resident model
+    with ThreadPoolExecutor(max_workers=args.sessions) as pool:
+        results = list(pool.map(simulate_session, range(args.sessions)))
+    after_all_rss = current_rss_mb()
+
+    warm_seconds = [seconds for seconds, _ in results]
+    distinct_models = {id(model) for _, models in results for model in models}
+    total_stores = sum(len(models) for _, models in results) + 4
+
+    print("\n=== Model registry benchmark ===")
+    print(f"Sessions simulated:      {args.sessions + 1}")
+    print(f"FAISSStores created:     {total_stores}")
+    print(f"Distinct model objects:  {len(distinct_models)}")
+    print(f"Registry stats:          {model_registry.stats()}")
+    print(f"Cold session startup:    {cold_seconds:.2f}s")
+    print(f"Warm session startup:    max {max(warm_seconds):.4f}s, mean {sum(warm_seconds) / len(warm_seconds):.4f}s")
+    print(f"RSS after first session: {after_cold_rss:.1f} MB (+{after_cold_rss - baseline_rss:.1f} MB)")
+    print(f"RSS after all sessions:  {after_all_rss:.1f} MB (+{after_all_rss - after_cold_rss:.1f} MB for {args.sessions} more sessions)")
+
+    if len(distinct_models) != 1:
+        print("FAIL: expected a single resident model copy")
+        sys.exit(1)
+    print("OK: a single resident model copy is shared by every store")
+
+if __name__ == "__main__":
+    main()
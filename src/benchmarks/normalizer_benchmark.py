@@ -0,0 +1,103 @@
+"""
+Throughput report for text normalization (WebScraper._clean_text followed by TextProcessor.clean_text).
+
+Normalizes extracted page text from the saved pages in benchmarks/fixtures/html
+and generated encyclopedia-sized pages, as ASCII and with non-ASCII text mixed in,
+with:
+
+    legacy      - the previous regex chains: four substitutions in the scraper, two in TextProcessor
+    fused       - PAGE_NORMALIZER then DOCUMENT_NORMALIZER (one scan each, ASCII fast path on)
+    fused/uni   - the same with the ASCII fast path off
+
+and reports:
+
+    MB/s        - normalization throughput in input characters (millions per second)
+    peak        - largest Python allocation while normalizing a page, as a multiple of the page's
+                  size (tracemalloc, measured in a separate untimed pass)
+    changed     - pages whose output differs from legacy; differences are expected only where
+                  legacy left artifacts of its pass order (double spaces where a removed
+                  character stood between spaces, spaces before punctuation, runs of dots)
+
+Run from the src/ directory:
+    python -m benchmarks.normalizer_benchmark --sections 200 --repeat 5
+"""
+import argparse
+import re
+import sys
+import os
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from benchmarks.extraction_benchmark import large_page, load_fixtures
+from ingestion.html_extractors import decode_html, get_extractor
+from processing.text_normalizer import TextNormalizer
+
+# Accented words, typographic punctuation and symbols, as on non-English or heavily typeset pages
+NON_ASCII = " Café – “naïve” résumé… 東京 ★ "
+
+def load_pages(sections: int) -> Dict[str, List[str]]:
+    """Extracted (not yet normalized) text of the fixtures and generated pages, per corpus."""
+    extractor = get_extractor("html.parser")
+    pages = list(load_fixtures().values()) + [large_page(sections, seed) for seed in range(4)]
+    texts = [extractor.extract(decode_html(content, "text/html"))[0] for content in pages]
+    return {
+        "ascii": texts,
+        "mixed": [text.replace(". ", "." + NON_ASCII, 50) for text in texts],
+    }
+
+def legacy_normalize(text: str) -> str:
+    """The scraper's and TextProcessor's cleaning as they were before the fused normalizer."""
+    text = re.sub(r'\s+', ' ', text)
+    text = re.sub(r'[.]{2,}', '.', text)
+    text = re.sub(r'\s+([.,!?])', r'\1', text)
+    text = text.strip()
+    text = re.sub(r'\s+', ' ', text).strip()
+    return re.sub(r'[^\w\s.,!?]', '', text)
+
+def fused(ascii_fast_path: bool) -> Callable[[str], str]:
+    page = TextNormalizer(filter_characters=False, ascii_fast_path=ascii_fast_path)
+    document = TextNormalizer(filter_characters=True, ascii_fast_path=ascii_fast_path)
+    return lambda text: document.normalize(page.normalize(text))
+
+def peak_ratio(normalize: Callable[[str], str], texts: List[str]) -> float:
+    """Largest peak allocation over the pages, relative to each page's size in memory."""
+    ratios = []
+    for text in texts:
+        tracemalloc.start()
+        normalize(text)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        ratios.append(peak / sys.getsizeof(text))
+    return max(ratios)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sections", type=int, default=200, help="Sections per generated page")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per normalizer (best is reported)")
+    args = parser.parse_args()
+
+    normalizers = [
+        ("legacy", legacy_normalize),
+        ("fused", fused(ascii_fast_path=True)),
+        ("fused/uni", fused(ascii_fast_path=False)),
+    ]
+    print(f"{'corpus':<8} {'normalizer':<12} {'MB/s':>7} {'peak':>6} {'changed':>8}")
+    for corpus, texts in load_pages(args.sections).items():
+        size = sum(len(text) for text in texts)
+        baseline = [legacy_normalize(text) for text in texts]
+        for name, normalize in normalizers:
+            timings = []
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                outputs = [normalize(text) for text in texts]
+                timings.append(time.perf_counter() - started)
+            changed = sum(output != expected for output, expected in zip(outputs, baseline))
+            print(f"{corpus:<8} {name:<12} {size / min(timings) / 1e6:>7.1f} "
+                  f"{peak_ratio(normalize, texts):>5.1f}x {changed:>5}/{len(texts)}")
+        print(f"{corpus:<8} {size / 1e6:.1f} MB in {len(texts)} pages\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Throughput and chunk-size report for TextSplitter's character and token modes.
+
+Splits a multi-MB document (the text of the saved pages in
+benchmarks/fixtures/html, repeated up to --megabytes) with:
+
+    legacy      - the previous character splitter (a slice and four rfind calls per chunk)
+    chars       - the current character mode (bounded rfind, no window copies); must match legacy
+    tokens/<t>  - token mode with each installed tokenizer backend
+
+and reports:
+
+    MB/s        - splitting throughput, including tokenization in token mode
+    chunks      - number of chunks produced
+    max tok     - most tokens in any chunk, re-counted with --count-with
+    over        - chunks above --limit tokens, which the embedder would truncate
+    fill        - mean tokens per chunk as a share of --limit
+
+Run from the src/ directory:
+    python -m benchmarks.splitter_benchmark --megabytes 4 --chunk-tokens 256
+"""
+import argparse
+import glob
+import sys
+import os
+import time
+from typing import List
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from ingestion.html_extractors import decode_html, get_extractor
+from processing.text_processor import TextProcessor
+from processing.text_splitter import TextSplitter
+from processing.tokenization import available_tokenizers, get_tokenizer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "html")
+
+def load_text(megabytes: float) -> str:
+    """Cleaned fixture page text, repeated to the requested size."""
+    extractor = get_extractor("html.parser")
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "*.html"))):
+        with open(path, "rb") as f:
+            text, _ = extractor.extract(decode_html(f.read(), "text/html"))
+        pages.append(TextProcessor.process_document(text))
+    corpus = "\n\n".join(pages)
+    target = int(megabytes * 1024 * 1024)
+    return (corpus + "\n\n") * (target // (len(corpus) + 2) + 1)
+
+def legacy_split(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    """The character splitter as it was before token mode was added."""
+    if len(text) <= chunk_size:
+        return [text]
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = start + chunk_size
+        if end >= len(text):
+            chunks.append(text[start:])
+            break
+        chunk = text[start:end]
+        sentence_end = max(chunk.rfind('. '), chunk.rfind('! '), chunk.rfind('? '), chunk.rfind('\n\n'))
+        if sentence_end > chunk_size * 0.7:
+            end = start + sentence_end + 2
+            chunk = text[start:end]
+        chunks.append(chunk)
+        start = end - chunk_overlap
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megabytes", type=float, default=4, help="Size of the document to split")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per splitter (best is reported)")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="Characters per chunk in character mode")
+    parser.add_argument("--chunk-overlap", type=int, default=200, help="Character overlap")
+    parser.add_argument("--chunk-tokens", type=int, default=256, help="Token budget per chunk in token mode")
+    parser.add_argument("--token-overlap", type=int, default=32, help="Token overlap")
+    parser.add_argument("--limit", type=int, default=382,
+                        help="Tokens the embedder keeps (all-mpnet-base-v2: 384 minus 2 special tokens)")
+    parser.add_argument("--count-with", default="auto", help="Tokenizer used to count chunk tokens")
+    parser.add_argument("--tokenizers", nargs="*", default=None, help="Token-mode backends (default: all installed)")
+    args = parser.parse_args()
+
+    text = load_text(args.megabytes)
+    counter = get_tokenizer(args.count_with)
+    print(f"{len(text) / 1e6:.1f} MB of text; chunk tokens counted with {counter.name}")
+
+    splitters = [
+        ("legacy", lambda: legacy_split(text, args.chunk_size, args.chunk_overlap)),
+        ("chars", lambda: TextSplitter(args.chunk_size, args.chunk_overlap, chunk_tokens=0).split_text(text)),
+    ]
+    for name in args.tokenizers or available_tokenizers():
+        splitter = TextSplitter(chunk_tokens=args.chunk_tokens, token_overlap=args.token_overlap, tokenizer=name)
+        if splitter.tokenizer.name != name:
+            continue
+        splitters.append((f"tokens/{name}", lambda splitter=splitter: splitter.split_text(text)))
+
+    print(f"\n{'splitter':<16} {'MB/s':>7} {'chunks':>8} {'max tok':>8} {'over':>6} {'fill':>5}")
+    results = {}
+    for name, split in splitters:
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            chunks = split()
+            timings.append(time.perf_counter() - started)
+        results[name] = chunks
+        counts = [counter.count(chunk) for chunk in chunks]
+        over = sum(count > args.limit for count in counts)
+        fill = sum(min(count, args.limit) for count in counts) / len(counts) / args.limit
+        print(f"{name:<16} {len(text) / min(timings) / 1e6:>7.1f} {len(chunks):>8} {max(counts):>8} "
+              f"{over:>6} {fill:>5.0%}")
+
+    print(f"\nchars matches legacy: {results['chars'] == results['legacy']}")
+
+if __name__ == "__main__":
+    main()
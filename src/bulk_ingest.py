@@ -0,0 +1,44 @@
+"""
+Bulk ingestion of URL lists, sitemaps and local directories.
+
+Documents stream through fetch -> clean/split -> embed -> index with
+periodic checkpoints of the index. If a run crashes or is interrupted,
+running the same command again resumes where it left off.
+
+Run from the src/ directory:
+    python bulk_ingest.py --urls urls.txt
+    python bulk_ingest.py --sitemap https://example.com/sitemap.xml
+    python bulk_ingest.py --dir ../docs --checkpoint-every 500
+"""
+import argparse
+import sys
+from ingestion.bulk_ingestion import BulkIngestor
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", help="Text file with one URL per line ('#' starts a comment)")
+    parser.add_argument("--sitemap", help="Sitemap or sitemap index URL")
+    parser.add_argument("--dir", help="Directory of .html, .htm, .txt and .md files (searched recursively)")
+    parser.add_argument("--index", default=None, help="Index path (default: Config.FAISS_INDEX_PATH)")
+    parser.add_argument("--checkpoint", default=None, help="Checkpoint journal (default: next to the index)")
+    parser.add_argument("--checkpoint-every", type=int, default=None,
+                        help="Documents between checkpoints (default: Config.BULK_CHECKPOINT_DOCUMENTS)")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and start over")
+    args = parser.parse_args()
+    if not (args.urls or args.sitemap or args.dir):
+        parser.error("give at least one of --urls, --sitemap or --dir")
+    
+    ingestor = BulkIngestor(index_path=args.index, checkpoint_path=args.checkpoint,
+                            checkpoint_documents=args.checkpoint_every)
+    stats = ingestor.run(urls_file=args.urls, sitemap=args.sitemap, directory=args.dir, restart=args.restart)
+    
+    print(f"\nIngested {stats['ingested']} of {stats['documents']} document(s) "
+          f"({stats['chunks']} chunks, {stats['replaced']} old chunks replaced) in {stats['seconds']:.1f}s")
+    if stats["skipped"]:
+        print(f"Skipped {stats['skipped']} document(s) disallowed by robots.txt")
+    if stats["failed"]:
+        print(f"{stats['failed']} document(s) failed; run the same command again to retry them")
+    sys.exit(1 if stats["failed"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -34,7 +34,8 @@ class RAGChatbot:
             # Clear previous content
             self.manual_ingestor.vector_store = self.manual_ingestor.vector_store.__class__(
                 model_name=config.EMBEDDING_MODEL,
-                index_path=config.FAISS_INDEX_PATH
+                index_path=config.FAISS_INDEX_PATH,
+                device=config.EMBEDDING_DEVICE
             )
             
             # Ingest new content
@@ -62,13 +63,12 @@ class RAGChatbot:
             bool: Success status
         """
         try:
-            # Clear previous content
-            self.auto_ingestor.clear_index()
-            
-            # Ingest website content
+            # Ingest website content; pages unchanged since the last ingest are kept as they are
             summary, success = self.auto_ingestor.ingest_website(url, max_pages)
             
             if success:
+                # Answer from this site only, as before
+                self.auto_ingestor.drop_other_sites(url)
                 self.current_source = url
                 self.current_summary = summary
                 return True
@@ -91,46 +91,68 @@ class RAGChatbot:
         Returns:
             Dict containing answer and context
         """
+        return self.ask_batch([question], k)[0]
+    
+    def ask_batch(self, questions: List[str], k: int = 3) -> List[Dict[str, Any]]:
+        """
+        Ask several questions at once, sharing one embedding pass and one index search.
+        
+        Args:
+            questions: User questions
+            k: Number of relevant chunks to retrieve per question
+            
+        Returns:
+            List of dicts containing answer, context and citations, in question order
+        """
         if not self.current_source:
-            return {
+            return [{
                 "answer": "No content loaded. Please load content first using load_from_text() or load_from_url().",
                 "context": [],
+                "citations": [],
                 "source": None,
                 "summary": None
-            }
+            } for _ in questions]
         
         try:
-            # Get relevant chunks
+            # Get relevant chunks with their source, title and position
             if "http" in self.current_source:
-                context = self.auto_ingestor.query(question, k)
+                citations = self.auto_ingestor.query_batch(questions, k, with_citations=True)
             else:
-                context = self.manual_ingestor.query(question, k)
+                citations = self.manual_ingestor.query_batch(questions, k, with_citations=True)
             
-            if not context:
-                return {
-                    "answer": "I couldn't find relevant information in the loaded content to answer your question.",
-                    "context": [],
-                    "source": self.current_source,
-                    "summary": self.current_summary
-                }
+            return [self._build_response(question, cited) for question, cited in zip(questions, citations)]
             
-            # Generate answer based on context
-            answer = self._generate_answer(question, context)
-            
-            return {
-                "answer": answer,
-                "context": context,
+        except Exception as e:
+            return [{
+                "answer": f"Error processing question: {str(e)}",
+                "context": [],
+                "citations": [],
                 "source": self.current_source,
                 "summary": self.current_summary
-            }
-            
-        except Exception as e:
+            } for _ in questions]
+    
+    def _build_response(self, question: str, citations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Build the response dict for one question from its retrieved chunks and their citations."""
+        context = [citation["text"] for citation in citations]
+        if not context:
             return {
-                "answer": f"Error processing question: {str(e)}",
+                "answer": "I couldn't find relevant information in the loaded content to answer your question.",
                 "context": [],
+                "citations": [],
                 "source": self.current_source,
                 "summary": self.current_summary
             }
+        
+        # Generate answer based on context
+        answer = self._generate_answer(question, context)
+        
+        return {
+            "answer": answer,
+            "context": context,
+            "citations": citations,
+            "source": self.current_source,
+            "summary": self.current_summary
+        }
     
     def _generate_answer(self, question: str, context: List[str]) -> str:
         """
@@ -162,7 +184,8 @@ class RAGChatbot:
         """Clear all loaded content."""
         self.manual_ingestor.vector_store = self.manual_ingestor.vector_store.__class__(
             model_name=config.EMBEDDING_MODEL,
-            index_path=config.FAISS_INDEX_PATH
+            index_path=config.FAISS_INDEX_PATH,
+            device=config.EMBEDDING_DEVICE
         )
         self.auto_ingestor.clear_index()
         self.current_source = None
@@ -72,6 +72,9 @@ def phase2_demo():
     summary, success = ingestor.ingest_website(url, max_pages=1)
     
     if success:
+        # Query this site only, not pages left in the saved index by earlier runs
+        ingestor.drop_other_sites(url)
+        
         print("\nAI-Generated Summary:")
         print("-"*30)
         print(summary)
@@ -1,8 +1,17 @@
-from typing import List, Optional, Tuple
+import hashlib
+import itertools
+import json
+import time
+import numpy as np
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from processing.text_processor import TextProcessor
 from processing.text_splitter import TextSplitter
-from processing.summarizer import TextSummarizer
+from processing.summarizer import TextSummarizer, WebsiteSummary
+from processing.parallel_processor import ParallelTextProcessor
 from vector_store.faiss_store import FAISSStore
+from vector_store.chunks import SourceText
+from utils.pipeline import Pipeline, rebatch
 from .web_scraper import WebScraper
 import sys
 import os
@@ -14,8 +23,15 @@ class AutomaticIngestor:
         self.web_scraper = None
         self.text_processor = None
         self.text_splitter = None
+        self.text_workers = None
         self.summarizer = None
         self.vector_store = None
+        # site url -> {page url: {"hash": fingerprint of the cleaned text, "chunks": count}}
+        self._fingerprints: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # Measured clean/split + embed cost, used to estimate the time unchanged pages save
+        self._seconds_per_chunk = None
+        # Page counts and timings of the last ingest_website call
+        self.last_report: Dict[str, Any] = {}
         
     def _get_components(self):
         """Lazy load components to avoid initialization issues"""
@@ -26,106 +42,281 @@ class AutomaticIngestor:
                 chunk_size=config.CHUNK_SIZE,
                 chunk_overlap=config.CHUNK_OVERLAP
             )
+            # Cleans and splits in worker processes once an ingest is large enough
+            self.text_workers = ParallelTextProcessor(
+                chunk_size=config.CHUNK_SIZE,
+                chunk_overlap=config.CHUNK_OVERLAP
+            )
             self.summarizer = TextSummarizer()
             self.vector_store = FAISSStore(
                 model_name=config.EMBEDDING_MODEL,
-                index_path=config.FAISS_INDEX_PATH
+                index_path=config.FAISS_INDEX_PATH,
+                device=config.EMBEDDING_DEVICE
             )
+            # Re-ingests build on the saved pages instead of starting from zero
+            self.vector_store.load_index()
+            self._load_fingerprints()
         return self.web_scraper, self.text_processor, self.text_splitter, self.summarizer, self.vector_store
         
-    def ingest_website(self, url: str, max_pages: int = 3) -> Tuple[str, bool]:
+    def ingest_website(self, url: str, max_pages: int = 3,
+                       on_summary: Callable[[str, str], None] = None) -> Tuple[str, bool]:
         """
         Ingest website content automatically.
         
+        Each page's chunks are stored under the page's URL, and a fingerprint
+        of its cleaned text is kept per site next to the index. Re-ingesting a
+        site skips pages whose fingerprint is unchanged, re-chunks and
+        re-embeds only changed and new pages, and removes the chunks of pages
+        that are no longer found. The page counts and the estimated time saved
+        are printed and kept in self.last_report.
+        
+        Pages stream through scrape -> clean/split -> embed -> index stages
+        running concurrently, connected by bounded queues: chunks of the first
+        pages are embedded while later pages are still downloading, and memory
+        is bounded by the queue sizes rather than by the size of the site.
+        
         Args:
             url: Website URL to ingest
             max_pages: Maximum number of pages to scrape
+            on_summary: Called with (page URL, page summary) as each page is summarized,
+                        from a summarizing thread (see WebsiteSummary); in textrank mode
+                        pages are only summarized if ranking finds no chunks
             
         Returns:
             Tuple of (summary, success_status)
         """
+        website_summary = None
         try:
             # Get lazy loaded components
             web_scraper, text_processor, text_splitter, summarizer, vector_store = self._get_components()
             
             print(f"Starting website ingestion for: {url}")
+            started = time.perf_counter()
             
-            # Scrape website content
-            print("Step 1: Scraping website content...")
-            contents = web_scraper.scrape_multiple_pages(url, max_pages)
-            
-            if not contents:
-                error_msg = "Failed to scrape website content. Please check the URL and try again."
-                print(error_msg)
-                return error_msg, False
-            
-            print(f"Step 1 Complete: Successfully scraped {len(contents)} page(s)")
+            previous = self._fingerprints.get(url, {})
+            fingerprints: Dict[str, Dict[str, Any]] = {}
+            counts = {"unchanged": 0, "updated": 0, "added": 0, "removed": 0}
+            reused_chunks = 0
+            textrank = config.SUMMARY_MODE == "textrank"
+            # Pages are summarized on a thread pool while the pipeline runs; in textrank
+            # mode only the pages it ranks are kept, to summarize if it finds no chunks
+            website_summary = None if textrank else WebsiteSummary(summarizer, on_summary=on_summary)
+            ranked_pages: List[Tuple[str, str]] = []
             
-            # Process and combine all content
-            all_processed_text = ""
-            all_chunks = []
+            def scrape(pages):
+                # Only pages whose cleaned text changed go on to be chunked and embedded
+                nonlocal reused_chunks
+                for page in pages:
+                    if website_summary is not None:
+                        website_summary.add(page.content, page.url)
+                    elif not config.SUMMARY_MAX_PAGES or len(ranked_pages) < config.SUMMARY_MAX_PAGES:
+                        ranked_pages.append((page.content, page.url))
+                    digest = hashlib.sha1(page.content.encode('utf-8')).hexdigest()
+                    known = previous.get(page.url)
+                    if known is not None and known["hash"] == digest and len(vector_store.ids_for_source(page.url)):
+                        fingerprints[page.url] = known
+                        counts["unchanged"] += 1
+                        reused_chunks += known["chunks"]
+                        continue
+                    fingerprints[page.url] = {"hash": digest, "chunks": 0}
+                    counts["updated" if known is not None else "added"] += 1
+                    yield page
             
-            print("Step 2: Processing and chunking content...")
-            for i, content in enumerate(contents):
-                print(f"Processing page {i+1}...")
-                
-                # Clean the text
-                processed_text = text_processor.process_document(content)
-                all_processed_text += processed_text + "\n\n"
-                
-                # Split into chunks
-                chunks = text_splitter.split_text(processed_text)
-                all_chunks.extend(chunks)
-                print(f"Page {i+1}: Created {len(chunks)} chunks")
+            def clean_and_split(pages):
+                order = deque()
+                def contents():
+                    for page in pages:
+                        order.append(page)
+                        yield page.content
+                # Clean the text and split it into chunk spans, in worker processes on large sites
+                for text, spans in self.text_workers.imap(contents()):
+                    page = order.popleft()
+                    chunks = SourceText(text, page.url, page.title).chunks(spans)
+                    print(f"{page.url}: Created {len(chunks)} chunks")
+                    yield page.url, chunks
             
-            print(f"Step 2 Complete: Total {len(all_chunks)} text chunks created")
+            def embed(pages):
+                # Start a batch as soon as enough chunks are ready; batches span pages
+                for chunks, sources, finished in rebatch(pages, config.EMBED_BATCH_SIZE):
+                    embeddings = vector_store.encode_documents([chunk.text for chunk in chunks], show_progress=False) if chunks else None
+                    yield chunks, sources, embeddings, finished
             
-            # Generate summary
-            print("Step 3: Generating AI summary...")
-            try:
-                summary = summarizer.summarize_website_content(contents)
-                print(f"Step 3 Complete: Summary generated ({len(summary)} characters)")
-            except Exception as e:
-                print(f"Warning: Summary generation failed: {e}")
-                summary = f"Successfully processed {len(contents)} pages with {len(all_chunks)} content chunks. Unable to generate AI summary due to processing error."
+            pipeline = Pipeline(config.PIPELINE_QUEUE_SIZE)
+            pipeline.add_stage("scrape", scrape, unit="pages")
+            pipeline.add_stage("clean/split", clean_and_split, unit="chunks", size=lambda page: len(page[1]))
+            pipeline.add_stage("embed", embed, unit="chunks", size=lambda batch: len(batch[0]))
             
-            # Add to vector store
-            print("Step 4: Creating vector embeddings...")
+            print("Streaming changed pages through scrape -> clean/split -> embed -> index...")
+            started_pages = set()
+            finished_pages = set()
+            embedded = 0
             try:
-                vector_store.add_documents(all_chunks)
-                print("Step 4 Complete: Vector embeddings created")
-                
-                # Test the vector store immediately
-                test_results = vector_store.similarity_search("test", k=1)
-                print(f"Vector store test: Found {len(test_results)} results for test query")
-                
+                for chunks, sources, embeddings, finished in pipeline.run(web_scraper.iter_crawl(url, max_pages)):
+                    # A changed page's old chunks go just before its first new chunk
+                    for source in itertools.chain(sources, finished):
+                        if source not in started_pages:
+                            started_pages.add(source)
+                            vector_store.delete(source)
+                    if chunks:
+                        vector_store.add_chunks(chunks, embeddings)
+                        embedded += len(chunks)
+                        for source in sources:
+                            fingerprints[source]["chunks"] += 1
+                    finished_pages.update(finished)
+                    progress = pipeline.progress()
+                    print(f"Progress: {progress['scrape']} pages scraped ({counts['unchanged']} unchanged), "
+                          f"{embedded} chunks indexed")
             except Exception as e:
+                # Pages re-indexed so far keep their new chunks; a page cut off
+                # half-way is removed and picked up again by the next ingest
+                partial = started_pages - finished_pages
+                for source in partial:
+                    vector_store.delete(source)
+                kept = {page: fingerprint for page, fingerprint in previous.items() if page not in partial}
+                kept.update({page: fingerprints[page] for page in finished_pages})
+                self._fingerprints[url] = kept
                 print(f"Error creating embeddings: {e}")
                 import traceback
                 traceback.print_exc()
                 return f"Error creating embeddings: {str(e)}", False
             
-            # Save the index
-            print("Step 5: Saving index...")
+            if not fingerprints:
+                error_msg = "Failed to scrape website content. Please check the URL and try again."
+                print(error_msg)
+                return error_msg, False
+            
+            # Pages that were not found again; chunks stored under the site URL
+            # itself predate per-page fingerprints
+            shared = {page for site, pages in self._fingerprints.items() if site != url for page in pages}
+            removed_chunks = 0
+            for page in previous:
+                if page not in fingerprints:
+                    counts["removed"] += 1
+                    if page not in shared:
+                        removed_chunks += vector_store.delete(page)
+            if url not in fingerprints and url not in shared:
+                removed_chunks += vector_store.delete(url)
+            self._fingerprints[url] = fingerprints
+            
+            if embedded:
+                stage_seconds = sum(stats.busy for stats in pipeline.stats if stats.name != "scrape")
+                self._seconds_per_chunk = stage_seconds / embedded
+            seconds_saved = reused_chunks * (self._seconds_per_chunk or 0.0)
+            self.last_report = dict(counts, chunks_embedded=embedded, chunks_reused=reused_chunks,
+                                    chunks_removed=removed_chunks, seconds=time.perf_counter() - started,
+                                    seconds_saved=seconds_saved)
+            print(f"Pages: {counts['unchanged']} unchanged, {counts['updated']} updated, {counts['added']} added, "
+                  f"{counts['removed']} removed; {embedded} chunks embedded, {reused_chunks} reused "
+                  f"(~{seconds_saved:.1f}s saved)")
+            if embedded:
+                print(pipeline.report())
+            
+            # Generate summary
             try:
-                self.save_index()
-                print("Step 5 Complete: Index saved")
+                summary = self._textrank_summary(list(fingerprints)) if textrank else None
+                if not summary:
+                    if website_summary is None:
+                        website_summary = WebsiteSummary(summarizer, on_summary=on_summary)
+                        for content, page in ranked_pages:
+                            website_summary.add(content, page)
+                    summary = website_summary.result()
+                print(f"Summary generated ({len(summary)} characters)")
             except Exception as e:
-                print(f"Warning: Failed to save index: {e}")
+                print(f"Warning: Summary generation failed: {e}")
+                summary = f"Successfully processed {len(fingerprints)} pages with {embedded + reused_chunks} content chunks. Unable to generate AI summary due to processing error."
             
-            print(f"SUCCESS: Website ingestion completed! Processed {len(all_chunks)} text chunks")
+            # Save the index
+            if counts["updated"] or counts["added"] or counts["removed"] or removed_chunks:
+                print("Saving index...")
+                try:
+                    self.save_index()
+                    print("Index saved")
+                except Exception as e:
+                    print(f"Warning: Failed to save index: {e}")
             
+            print(f"SUCCESS: Website ingestion completed! Processed {embedded} new text chunks")
             return summary, True
             
         except Exception as e:
             error_msg = f"Error during website ingestion: {str(e)}"
             print(error_msg)
             return error_msg, False
+        finally:
+            if website_summary is not None:
+                website_summary.close()
+    
+    def _textrank_summary(self, pages: List[str]) -> Optional[str]:
+        """
+        Extractive summary ranked over the stored chunk embeddings of the site's pages.
+        
+        Only the first Config.SUMMARY_MAX_PAGES pages in crawl order are
+        ranked; unchanged pages use the vectors embedded by earlier ingests.
+        
+        Returns:
+            The summary, or None if the pages have no usable chunks
+        """
+        _, _, _, summarizer, vector_store = self._get_components()
+        if config.SUMMARY_MAX_PAGES:
+            pages = pages[:config.SUMMARY_MAX_PAGES]
+        texts = []
+        vectors = []
+        for page in pages:
+            citations, page_vectors = vector_store.source_chunks(page)
+            if citations:
+                texts.extend(citation["text"] for citation in citations)
+                vectors.append(page_vectors)
+        if not texts:
+            return None
+        return summarizer.summarize_chunks(texts, np.vstack(vectors), max_length=200)
+    
+    def drop_other_sites(self, url: str) -> int:
+        """
+        Remove every chunk that does not belong to url's pages, so queries only see that site.
+        
+        Returns:
+            Number of chunks removed
+        """
+        _, _, _, _, vector_store = self._get_components()
+        keep = set(self._fingerprints.get(url, {}))
+        removed = 0
+        for source in vector_store.sources() - keep:
+            removed += vector_store.delete(source)
+        self._fingerprints = {url: self._fingerprints[url]} if url in self._fingerprints else {}
+        if removed:
+            print(f"Removed {removed} chunks from other sources")
+            self.save_index()
+        return removed
+    
+    def _fingerprints_path(self) -> str:
+        return f"{config.FAISS_INDEX_PATH}.fingerprints.json"
+    
+    def _load_fingerprints(self):
+        """Read the page fingerprints saved with the index, if any."""
+        path = self._fingerprints_path()
+        if not os.path.exists(path):
+            return
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            self._fingerprints = saved.get("sites", {})
+            self._seconds_per_chunk = saved.get("seconds_per_chunk")
+        except (OSError, ValueError) as e:
+            # Every page then counts as new and is re-embedded (cheaply, via the embedding cache)
+            print(f"Warning: Could not read page fingerprints {path}: {e}")
+    
+    def _save_fingerprints(self):
+        path = self._fingerprints_path()
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump({"version": 1, "seconds_per_chunk": self._seconds_per_chunk, "sites": self._fingerprints}, f)
+        os.replace(temporary, path)
     
     def save_index(self, path: Optional[str] = None):
-        """Save the vector store index."""
+        """Save the vector store index, then the page fingerprints that describe it."""
         _, _, _, _, vector_store = self._get_components()
         vector_store.save_index(path)
+        if path is None or path == config.FAISS_INDEX_PATH:
+            self._save_fingerprints()
         
     def query(self, question: str, k: int = 3) -> List[str]:
         """Query the vector store for relevant chunks."""
@@ -154,9 +345,38 @@ class AutomaticIngestor:
             traceback.print_exc()
             return []
     
+    def query_batch(self, questions: List[str], k: int = 3,
+                    with_citations: bool = False) -> List[List[Union[str, Dict[str, Any]]]]:
+        """
+        Query the vector store for several questions in one batched search.
+        
+        Args:
+            with_citations: Return citation dicts (text, source, title, position, start, end) instead of chunk texts
+        """
+        print(f"Batch querying {len(questions)} questions with k={k}")
+        try:
+            _, _, _, _, vector_store = self._get_components()
+            
+            if vector_store.index is None or len(vector_store.documents) == 0:
+                print("Vector store has no content loaded")
+                return [[] for _ in questions]
+            
+            if with_citations:
+                results = vector_store.similarity_search_with_citations_batch(questions, k)
+            else:
+                results = vector_store.similarity_search_batch(questions, k)
+            print(f"Batch query returned {sum(len(r) for r in results)} results")
+            
+            return results
+        except Exception as e:
+            print(f"Error in batch query: {e}")
+            import traceback
+            traceback.print_exc()
+            return [[] for _ in questions]
+    
     def ingest_url(self, url: str, max_pages: int = 3) -> str:
         """
-        Ingest website content automatically (alias for ingest_website).
+        Ingest website content automatically and answer queries from this site only.
         
         Args:
             url: Website URL to ingest
@@ -167,13 +387,18 @@ class AutomaticIngestor:
         """
         summary, success = self.ingest_website(url, max_pages)
         if success:
+            # The index is shared with earlier runs; drop other sites and manually added text
+            self.drop_other_sites(url)
             return summary
         else:
             raise Exception(summary)
     
     def clear_index(self):
-        """Clear the current vector store."""
+        """Clear the current vector store and forget every page fingerprint."""
+        self._get_components()
         self.vector_store = FAISSStore(
             model_name=config.EMBEDDING_MODEL,
-            index_path=config.FAISS_INDEX_PATH
+            index_path=config.FAISS_INDEX_PATH,
+            device=config.EMBEDDING_DEVICE
         )
+        self._fingerprints = {}
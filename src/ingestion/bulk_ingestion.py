@@ -0,0 +1,292 @@
+import itertools
+import json
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+from processing.parallel_processor import ParallelTextProcessor
+from vector_store.faiss_store import FAISSStore
+from vector_store.chunks import Chunk, SourceText
+from utils.pipeline import Pipeline, rebatch
+from .crawl_frontier import RobotsPolicy
+from .html_extractors import decode_html
+from .web_scraper import ScrapedPage, WebScraper
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from config.config import config
+
+class BulkIngestor:
+    """
+    Batch ingestion of URL lists, sitemaps and local directories.
+
+    Every document (a URL, or a file:// URI for local files) is indexed as
+    its own source, replacing any chunks it had from an earlier run. The
+    documents stream through fetch -> clean/split -> embed -> index stages.
+    Every checkpoint_documents documents (or checkpoint_seconds) the index
+    is saved and the documents completed since the last checkpoint are
+    appended to a checkpoint journal next to the index. A crashed or
+    interrupted run started again with the same inputs skips the documents
+    the journal lists and continues with the rest. Documents that were
+    half-indexed at the crash are simply ingested again; their partial
+    chunks are replaced and the embedding cache spares re-encoding them.
+    """
+
+    FILE_SUFFIXES = ('.html', '.htm', '.txt', '.md')
+    HTML_SUFFIXES = ('.html', '.htm')
+
+    def __init__(self, index_path: str = None, checkpoint_path: str = None,
+                 checkpoint_documents: int = None, checkpoint_seconds: float = None):
+        """
+        Args:
+            index_path: Index to ingest into (defaults to Config.FAISS_INDEX_PATH)
+            checkpoint_path: Checkpoint journal (defaults to <index_path>.bulk_checkpoint.jsonl)
+            checkpoint_documents: Documents between checkpoints (defaults to Config.BULK_CHECKPOINT_DOCUMENTS)
+            checkpoint_seconds: Maximum seconds between checkpoints (defaults to Config.BULK_CHECKPOINT_SECONDS)
+        """
+        self.index_path = index_path or config.FAISS_INDEX_PATH
+        self.checkpoint_path = checkpoint_path or f"{self.index_path}.bulk_checkpoint.jsonl"
+        self.checkpoint_documents = checkpoint_documents or config.BULK_CHECKPOINT_DOCUMENTS
+        self.checkpoint_seconds = checkpoint_seconds or config.BULK_CHECKPOINT_SECONDS
+        self.web_scraper = None
+        self.text_workers = None
+        self.vector_store = None
+
+    def _get_components(self):
+        """Lazy load components to avoid initialization issues"""
+        if self.web_scraper is None:
+            self.web_scraper = WebScraper()
+            self.text_workers = ParallelTextProcessor(
+                chunk_size=config.CHUNK_SIZE,
+                chunk_overlap=config.CHUNK_OVERLAP
+            )
+            self.vector_store = FAISSStore(
+                model_name=config.EMBEDDING_MODEL,
+                index_path=self.index_path,
+                device=config.EMBEDDING_DEVICE
+            )
+        return self.web_scraper, self.text_workers, self.vector_store
+
+    def collect_sources(self, urls_file: str = None, sitemap: str = None, directory: str = None) -> List[str]:
+        """
+        List the documents to ingest, without duplicates and in a stable order.
+
+        Args:
+            urls_file: Text file with one URL per line ('#' starts a comment)
+            sitemap: Sitemap or sitemap index URL
+            directory: Directory searched recursively for .html, .htm, .txt and .md files
+        """
+        sources = {}
+        if urls_file:
+            with open(urls_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    url = line.split('#', 1)[0].strip()
+                    if url:
+                        sources.setdefault(url, None)
+        if sitemap:
+            web_scraper, _, _ = self._get_components()
+            for url in web_scraper.iter_sitemap([sitemap]):
+                sources.setdefault(url.strip(), None)
+        if directory:
+            for path in sorted(Path(directory).rglob('*')):
+                if path.is_file() and path.suffix.lower() in self.FILE_SUFFIXES:
+                    sources.setdefault(path.resolve().as_uri(), None)
+        return list(sources)
+
+    def run(self, urls_file: str = None, sitemap: str = None, directory: str = None,
+            restart: bool = False) -> Dict[str, Any]:
+        """
+        Ingest every document from the given inputs, resuming an interrupted run.
+
+        Args:
+            urls_file: Text file with one URL per line
+            sitemap: Sitemap or sitemap index URL
+            directory: Directory of HTML and text files
+            restart: Ignore an existing checkpoint and ingest everything again
+
+        Returns:
+            Dictionary of document and chunk counts for this run
+        """
+        job = {
+            "urls_file": os.path.abspath(urls_file) if urls_file else None,
+            "sitemap": sitemap,
+            "directory": os.path.abspath(directory) if directory else None,
+        }
+        state = None if restart else self._load_checkpoint(job)
+        if state is not None and state["complete"]:
+            print(f"This job already completed (checkpoint {self.checkpoint_path}); use --restart to ingest it again")
+            return {"documents": len(state["done"]), "ingested": 0, "skipped": 0, "failed": 0,
+                    "chunks": 0, "replaced": 0, "seconds": 0.0}
+        if state is None:
+            state = {"done": set(), "complete": False}
+            self._start_checkpoint(job)
+
+        sources = self.collect_sources(urls_file, sitemap, directory)
+        todo = [source for source in sources if source not in state["done"]]
+        print(f"{len(sources)} document(s): {len(sources) - len(todo)} already ingested, {len(todo)} to go")
+        stats = self._ingest(todo)
+        stats["documents"] = len(sources)
+        if not stats["failed"]:
+            self._append_checkpoint({"complete": True})
+        return stats
+
+    def _ingest(self, sources: List[str]) -> Dict[str, Any]:
+        web_scraper, text_workers, vector_store = self._get_components()
+        # Continue on top of what earlier (possibly interrupted) runs saved
+        vector_store.load_index()
+        robots = RobotsPolicy(web_scraper._get, web_scraper.session.headers['User-Agent']) if config.CRAWL_RESPECT_ROBOTS else None
+        failed: List[str] = []
+        skipped: List[str] = []
+
+        def fetch(items: Iterator[str]):
+            # Windows of URLs are fetched concurrently; files are read in place
+            for window in iter(lambda: list(itertools.islice(items, 2 * web_scraper.max_in_flight)), []):
+                urls = [source for source in window if not source.startswith('file:')]
+                if robots is not None:
+                    disallowed = {url for url in urls if not robots.allowed(url)}
+                    skipped.extend(disallowed)
+                    urls = [url for url in urls if url not in disallowed]
+                pages = dict(zip(urls, web_scraper.process_pages(urls)))
+                for source in window:
+                    if source.startswith('file:'):
+                        page = self._read_file(source)
+                    elif source in pages:
+                        page = pages[source]
+                    else:
+                        continue
+                    if page is None:
+                        failed.append(source)
+                        continue
+                    yield page
+
+        def clean_and_split(documents: Iterator[ScrapedPage]):
+            order = deque()
+            def contents():
+                for page in documents:
+                    order.append(page)
+                    yield page.content
+            for text, spans in text_workers.imap(contents()):
+                page = order.popleft()
+                # A blank document has one empty span; it gets no chunks
+                yield page.url, SourceText(text, page.url, page.title).chunks([span for span in spans if span[1] > span[0]])
+
+        def embed(documents: Iterator[Tuple[str, List[Chunk]]]):
+            # Batches span documents; each batch lists the documents whose last chunk it carries
+            for chunks, chunk_sources, finished in rebatch(documents, config.EMBED_BATCH_SIZE):
+                embeddings = vector_store.encode_documents([chunk.text for chunk in chunks], show_progress=False) if chunks else None
+                yield chunks, chunk_sources, embeddings, finished
+
+        pipeline = Pipeline(config.PIPELINE_QUEUE_SIZE)
+        pipeline.add_stage("fetch", fetch, unit="docs")
+        pipeline.add_stage("clean/split", clean_and_split, unit="docs")
+        pipeline.add_stage("embed", embed, unit="chunks", size=lambda batch: len(batch[0]))
+
+        started = time.monotonic()
+        last_checkpoint = started
+        replaced = 0
+        chunks = 0
+        ingested = 0
+        skipped_total = 0
+        completed: List[str] = []
+        started_sources: Set[str] = set()
+
+        def checkpoint():
+            nonlocal last_checkpoint, ingested, skipped_total
+            vector_store.save_index()
+            # The fetch stage keeps appending, so remove only what is recorded here
+            newly_skipped = skipped[:]
+            del skipped[:len(newly_skipped)]
+            # Written after the save, so every listed document is in the saved index
+            self._append_checkpoint({"done": completed, "skipped": newly_skipped, "chunks": chunks})
+            ingested += len(completed)
+            skipped_total += len(newly_skipped)
+            completed.clear()
+            last_checkpoint = time.monotonic()
+            elapsed = last_checkpoint - started
+            print(f"Checkpoint: {ingested}/{len(sources)} documents, {chunks} chunks, "
+                  f"{ingested / elapsed if elapsed else 0.0:.1f} documents/s")
+
+        for batch_chunks, batch_sources, embeddings, finished in pipeline.run(iter(sources)):
+            # A document's previous chunks (from an earlier run) go just before its first new chunk
+            for source in itertools.chain(batch_sources, finished):
+                if source not in started_sources:
+                    started_sources.add(source)
+                    replaced += vector_store.delete(source)
+            if batch_chunks:
+                vector_store.add_chunks(batch_chunks, embeddings)
+                chunks += len(batch_chunks)
+            completed.extend(finished)
+            if (len(completed) >= self.checkpoint_documents
+                    or time.monotonic() - last_checkpoint >= self.checkpoint_seconds):
+                checkpoint()
+        if completed or skipped:
+            # Whatever the last checkpoint in the loop did not cover
+            checkpoint()
+
+        print(pipeline.report())
+        if skipped_total:
+            print(f"Skipped {skipped_total} URL(s) disallowed by robots.txt")
+        if failed:
+            print(f"{len(failed)} document(s) could not be read and will be retried on the next run")
+        return {
+            "ingested": ingested,
+            "skipped": skipped_total,
+            "failed": len(failed),
+            "chunks": chunks,
+            "replaced": replaced,
+            "seconds": time.monotonic() - started,
+        }
+
+    def _read_file(self, source: str) -> Optional[ScrapedPage]:
+        """Main content of a local HTML file, or the text of a text file (titled by its file name)."""
+        path = Path(url2pathname(urlparse(source).path))
+        try:
+            data = path.read_bytes()
+        except OSError as e:
+            print(f"Error reading {path}: {e}")
+            return None
+        if path.suffix.lower() in self.HTML_SUFFIXES:
+            web_scraper, _, _ = self._get_components()
+            return web_scraper.parse_html(data, source)
+        return ScrapedPage(url=source, content=decode_html(data), title=path.name)
+
+    def _start_checkpoint(self, job: Dict[str, Any]):
+        os.makedirs(os.path.dirname(os.path.abspath(self.checkpoint_path)), exist_ok=True)
+        with open(self.checkpoint_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"job": job, "started": time.time()}) + "\n")
+
+    def _append_checkpoint(self, record: Dict[str, Any]):
+        """Append one journal line and make it durable before returning."""
+        with open(self.checkpoint_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _load_checkpoint(self, job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Documents already ingested by an earlier run of this job, or None to start afresh."""
+        if not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        try:
+            header = json.loads(lines[0]) if lines else {}
+        except ValueError:
+            header = {}
+        if header.get("job") != job:
+            print(f"Checkpoint {self.checkpoint_path} belongs to a different job; starting over")
+            return None
+        done = set()
+        complete = False
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A write torn by the crash; everything before it is intact
+                break
+            done.update(record.get("done", []))
+            done.update(record.get("skipped", []))
+            complete = record.get("complete", complete)
+        print(f"Resuming from checkpoint {self.checkpoint_path}: {len(done)} document(s) already ingested")
+        return {"done": done, "complete": complete}
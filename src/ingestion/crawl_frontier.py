@@ -0,0 +1,168 @@
+import gzip
+import hashlib
+import xml.etree.ElementTree as ET
+from collections import deque
+from urllib.parse import urlparse, urlunparse, urldefrag, parse_qsl, urlencode
+from urllib.robotparser import RobotFileParser
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+import requests
+
+# Query parameters that only track the visitor and never change page content
+TRACKING_PARAMS = ('utm_', 'gclid', 'fbclid', 'mc_cid', 'mc_eid')
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+# Links to these are never queued: they are not HTML and can be arbitrarily large
+SKIP_EXTENSIONS = (
+    '.pdf', '.zip', '.gz', '.tar', '.rar', '.7z', '.exe', '.dmg', '.iso',
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.ico', '.bmp', '.tif', '.tiff',
+    '.mp3', '.wav', '.ogg', '.mp4', '.m4v', '.mov', '.avi', '.webm', '.mkv',
+    '.css', '.js', '.woff', '.woff2', '.ttf', '.doc', '.docx', '.xls', '.xlsx', '.ppt', '.pptx',
+)
+
+def canonicalize_url(url: str) -> str:
+    """
+    Canonical form of a URL, so variants of one page are crawled once.
+
+    Drops the fragment, lowercases scheme and host, removes default ports,
+    empty paths become '/', tracking parameters are removed and the
+    remaining query parameters are sorted.
+    """
+    url, _ = urldefrag(url.strip())
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    host = (parsed.hostname or '').lower()
+    try:
+        port = parsed.port
+    except ValueError:
+        port = None
+    netloc = host if port is None or port == DEFAULT_PORTS.get(scheme) else f"{host}:{port}"
+    if parsed.username:
+        netloc = f"{parsed.username}@{netloc}"
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+        if not key.lower().startswith(TRACKING_PARAMS)
+    )
+    return urlunparse((scheme, netloc, parsed.path or '/', parsed.params, urlencode(query), ''))
+
+def url_host(url: str) -> str:
+    """Host (and non-default port) of a canonical URL."""
+    return urlparse(url).netloc
+
+def _url_key(url: str) -> bytes:
+    """Compact fixed-size key for the seen-URL set."""
+    return hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest()
+
+class RobotsPolicy:
+    """
+    Cached robots.txt rules per host.
+
+    robots.txt is fetched once per host through the crawler's own fetch
+    function. Missing files allow everything; 401/403 disallow everything,
+    matching urllib.robotparser.
+    """
+
+    def __init__(self, fetch: Callable[[str], requests.Response], user_agent: str):
+        self.fetch = fetch
+        self.user_agent = user_agent
+        self._parsers: Dict[str, RobotFileParser] = {}
+
+    def _parser(self, url: str) -> RobotFileParser:
+        parsed = urlparse(url)
+        key = f"{parsed.scheme}://{parsed.netloc}"
+        parser = self._parsers.get(key)
+        if parser is None:
+            parser = RobotFileParser(f"{key}/robots.txt")
+            try:
+                response = self.fetch(parser.url)
+                if response.status_code in (401, 403):
+                    parser.disallow_all = True
+                elif response.status_code >= 400:
+                    parser.allow_all = True
+                else:
+                    parser.parse(response.text.splitlines())
+            except Exception as e:
+                print(f"Could not read {parser.url}, assuming crawling is allowed: {e}")
+                parser.allow_all = True
+            self._parsers[key] = parser
+        return parser
+
+    def allowed(self, url: str) -> bool:
+        return self._parser(url).can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, url: str) -> Optional[float]:
+        """Crawl-delay the host asks for, if any."""
+        delay = self._parser(url).crawl_delay(self.user_agent)
+        return float(delay) if delay is not None else None
+
+    def sitemaps(self, url: str) -> List[str]:
+        """Sitemap URLs listed in the host's robots.txt."""
+        return self._parser(url).site_maps() or []
+
+def parse_sitemap(content: bytes) -> Tuple[List[str], List[str]]:
+    """
+    Parse a sitemap or sitemap index (optionally gzipped).
+
+    Returns:
+        Tuple of (page URLs, nested sitemap URLs)
+    """
+    if content[:2] == b'\x1f\x8b':
+        content = gzip.decompress(content)
+    root = ET.fromstring(content)
+    pages, sitemaps = [], []
+    for element in root.iter():
+        # Tags are namespaced, e.g. {http://www.sitemaps.org/schemas/sitemap/0.9}loc
+        if element.tag.rsplit('}', 1)[-1] != 'loc' or not element.text:
+            continue
+        pages.append(element.text.strip())
+    if root.tag.rsplit('}', 1)[-1] == 'sitemapindex':
+        pages, sitemaps = [], pages
+    return pages, sitemaps
+
+class CrawlFrontier:
+    """
+    Breadth-first crawl frontier restricted to a set of hosts.
+
+    URLs are canonicalized and remembered as 8-byte hashes, so every page
+    is queued at most once however many variants of its URL are linked.
+    Pages deeper than max_depth links from the seed, links to binary files
+    and pages disallowed by robots.txt are never queued.
+    """
+
+    def __init__(self, max_depth: int, robots: Optional[RobotsPolicy] = None,
+                 allowed_hosts: Optional[Set[str]] = None):
+        self.max_depth = max_depth
+        self.robots = robots
+        self.allowed_hosts = allowed_hosts
+        self._queue: Deque[Tuple[str, int]] = deque()
+        self._seen: Set[bytes] = set()
+        self.skipped_robots = 0
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def add(self, url: str, depth: int) -> bool:
+        """Queue url at depth unless it was seen, is too deep, off-site or disallowed."""
+        if depth > self.max_depth:
+            return False
+        url = canonicalize_url(url)
+        parsed = urlparse(url)
+        if parsed.scheme not in ('http', 'https') or parsed.path.lower().endswith(SKIP_EXTENSIONS):
+            return False
+        if self.allowed_hosts is not None and url_host(url) not in self.allowed_hosts:
+            return False
+        key = _url_key(url)
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        if self.robots is not None and not self.robots.allowed(url):
+            self.skipped_robots += 1
+            return False
+        self._queue.append((url, depth))
+        return True
+
+    def pop_batch(self, size: int) -> List[Tuple[str, int]]:
+        """Dequeue up to size (url, depth) pairs in breadth-first order."""
+        batch = []
+        while self._queue and len(batch) < size:
+            batch.append(self._queue.popleft())
+        return batch
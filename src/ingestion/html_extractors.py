@@ -0,0 +1,201 @@
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple, Type
+from bs4 import BeautifulSoup
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from config.config import config
+
+try:
+    import lxml.html
+    import lxml.etree
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+# Boilerplate removed before the main content is located (template text is never rendered)
+REMOVED_TAGS = ('script', 'style', 'nav', 'header', 'footer', 'aside', 'ads', 'template')
+# Fallback main-content container: a <div> with a class like "content", "main-col", "article-body"
+MAIN_CLASS_PATTERN = re.compile(r'content|main|article')
+
+_BOMS = ((b'\xef\xbb\xbf', 'utf-8'), (b'\xff\xfe', 'utf-16-le'), (b'\xfe\xff', 'utf-16-be'))
+_HEADER_CHARSET = re.compile(r'charset=["\']?([\w:.-]+)', re.I)
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w:.-]+)', re.I)
+_XML_DECLARATION = re.compile(r'^\s*<\?xml[^>]*\?>')
+
+def decode_html(content: bytes, content_type: Optional[str] = None) -> str:
+    """
+    Decode a page body once so every backend parses the same text.
+
+    Tries a byte-order mark, then the Content-Type charset, then a <meta>
+    charset, then UTF-8, and finally falls back to Windows-1252.
+    """
+    for bom, encoding in _BOMS:
+        if content.startswith(bom):
+            return content[len(bom):].decode(encoding, errors='replace')
+    candidates = []
+    header = _HEADER_CHARSET.search(content_type or '')
+    if header:
+        candidates.append(header.group(1))
+    meta = _META_CHARSET.search(content[:2048])
+    if meta:
+        candidates.append(meta.group(1).decode('ascii', errors='ignore'))
+    candidates.append('utf-8')
+    for encoding in candidates:
+        try:
+            return content.decode(encoding)
+        except (LookupError, UnicodeDecodeError):
+            continue
+    return content.decode('cp1252', errors='replace')
+
+class HTMLExtractor(ABC):
+    """
+    Parses a page once and returns its main-content text plus every link href.
+
+    All backends apply the same rules, so they produce the same text:
+        1. Collect the href of every <a href> in document order.
+        2. Remove REMOVED_TAGS elements with their contents.
+        3. Take the first <main>, else the first <article>, else the first
+           <div> whose class matches MAIN_CLASS_PATTERN, else <body>.
+        4. Join the element's non-empty, stripped text nodes with spaces.
+    """
+
+    name = None
+
+    @classmethod
+    def available(cls) -> bool:
+        """Whether the backend's parser library is installed."""
+        return True
+
+    @abstractmethod
+    def extract(self, html: str) -> Tuple[str, List[str]]:
+        """
+        Args:
+            html: Decoded page source
+
+        Returns:
+            Tuple of (main-content text, raw hrefs in document order)
+        """
+        raise NotImplementedError
+
+class BeautifulSoupExtractor(HTMLExtractor):
+    """Pure-Python html.parser via BeautifulSoup; always available but the slowest."""
+
+    name = "html.parser"
+
+    def extract(self, html: str) -> Tuple[str, List[str]]:
+        soup = BeautifulSoup(html, 'html.parser')
+        links = [anchor['href'] for anchor in soup.find_all('a', href=True)]
+
+        for element in soup(list(REMOVED_TAGS)):
+            element.decompose()
+
+        main = soup.find('main') or soup.find('article') or soup.find('div', class_=MAIN_CLASS_PATTERN)
+        if main is None:
+            main = soup.find('body')
+        if main is None:
+            # html.parser does not invent a <body>; use the document minus its title
+            for title in soup('title'):
+                title.decompose()
+            main = soup
+        return main.get_text(separator=' ', strip=True), links
+
+class LxmlExtractor(HTMLExtractor):
+    """libxml2's HTML parser through lxml.html."""
+
+    name = "lxml"
+
+    @classmethod
+    def available(cls) -> bool:
+        return lxml is not None
+
+    def extract(self, html: str) -> Tuple[str, List[str]]:
+        # lxml refuses str input that carries an XML encoding declaration
+        html = _XML_DECLARATION.sub('', html, count=1)
+        if not html.strip():
+            return "", []
+        root = lxml.html.document_fromstring(html)
+        links = [anchor.get('href') for anchor in root.iter('a') if anchor.get('href') is not None]
+
+        # drop_tree merges the element's tail into the preceding text; pad it so
+        # "a<script/>b" stays two words, as in the other backends
+        for element in list(root.iter(*REMOVED_TAGS, lxml.etree.Comment)):
+            if element.tail:
+                element.tail = ' ' + element.tail
+            element.drop_tree()
+
+        # lxml elements are falsy when childless, so test against None explicitly
+        main = next(root.iter('main'), None)
+        if main is None:
+            main = next(root.iter('article'), None)
+        if main is None:
+            main = next((div for div in root.iter('div') if MAIN_CLASS_PATTERN.search(div.get('class', ''))), None)
+        if main is None:
+            main = root.find('body')
+        if main is None:
+            return "", links
+        return ' '.join(text.strip() for text in main.itertext() if text.strip()), links
+
+class SelectolaxExtractor(HTMLExtractor):
+    """The lexbor HTML5 parser (C) through selectolax; the fastest backend."""
+
+    name = "selectolax"
+
+    @classmethod
+    def available(cls) -> bool:
+        return LexborHTMLParser is not None
+
+    def extract(self, html: str) -> Tuple[str, List[str]]:
+        tree = LexborHTMLParser(html)
+        links = [node.attributes.get('href') or '' for node in tree.css('a[href]')]
+
+        for node in tree.css(', '.join(REMOVED_TAGS)):
+            node.decompose()
+
+        main = tree.css_first('main')
+        if main is None:
+            main = tree.css_first('article')
+        if main is None:
+            main = next((div for div in tree.css('div[class]')
+                         if MAIN_CLASS_PATTERN.search(div.attributes.get('class') or '')), None)
+        if main is None:
+            main = tree.body
+        if main is None:
+            return "", links
+        return main.text(deep=True, separator=' ', strip=True), links
+
+EXTRACTORS: Dict[str, Type[HTMLExtractor]] = {
+    cls.name: cls for cls in (BeautifulSoupExtractor, LxmlExtractor, SelectolaxExtractor)
+}
+# Order tried by "auto", fastest first
+_PREFERENCE = ("selectolax", "lxml", "html.parser")
+
+def available_extractors() -> List[str]:
+    """Names of the backends whose parser libraries are installed."""
+    return [name for name, cls in EXTRACTORS.items() if cls.available()]
+
+def get_extractor(name: str = None) -> HTMLExtractor:
+    """
+    Create an extraction backend.
+
+    Args:
+        name: "html.parser", "lxml", "selectolax" or "auto" (fastest installed);
+              defaults to Config.HTML_EXTRACTOR
+
+    Returns:
+        HTMLExtractor instance; falls back to html.parser if the backend is not installed
+    """
+    name = (name or config.HTML_EXTRACTOR).lower()
+    if name == "auto":
+        name = next(candidate for candidate in _PREFERENCE if EXTRACTORS[candidate].available())
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown HTML extractor '{name}', expected one of {('auto',) + tuple(EXTRACTORS)}")
+    if not EXTRACTORS[name].available():
+        print(f"Warning: HTML extractor '{name}' is not installed, falling back to html.parser")
+        name = "html.parser"
+    return EXTRACTORS[name]()
@@ -0,0 +1,161 @@
+import os
+import sqlite3
+import threading
+import time
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+from typing import Dict, Optional, Any
+
+class HTTPCache:
+    """
+    Persistent cache of HTTP response bodies for conditional re-crawls.
+
+    Responses carrying an ETag or Last-Modified validator are stored in
+    SQLite keyed by canonical URL. Re-fetching sends If-None-Match /
+    If-Modified-Since, and a 304 answer is served from the stored body, so
+    unchanged pages cost a round trip instead of a download. The cache is
+    bounded to max_entries and evicts least recently used pages first.
+    """
+
+    _shared: Dict[str, "HTTPCache"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: str, max_entries: int = 20000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0         # 304 Not Modified, body served from cache
+        self.misses = 0       # full 200 downloads
+        self.evictions = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " url TEXT PRIMARY KEY,"
+            " final_url TEXT NOT NULL,"
+            " etag TEXT,"
+            " last_modified TEXT,"
+            " content_type TEXT,"
+            " body BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self._conn.commit()
+
+    @classmethod
+    def shared(cls, path: str, max_entries: int = 20000) -> "HTTPCache":
+        """Return the process-wide cache instance for a path."""
+        with cls._shared_lock:
+            cache = cls._shared.get(path)
+            if cache is None:
+                cache = cls(path, max_entries)
+                cls._shared[path] = cache
+            return cache
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """Validator headers for re-requesting a cached url (empty if not cached)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+        headers = {}
+        if row:
+            etag, last_modified = row
+            if etag:
+                headers['If-None-Match'] = etag
+            if last_modified:
+                headers['If-Modified-Since'] = last_modified
+        return headers
+
+    def not_modified(self, url: str) -> Optional[requests.Response]:
+        """Rebuild the cached 200 response for url after the server answered 304."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT final_url, etag, last_modified, content_type, body FROM responses WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+            self.hits += 1
+        final_url, etag, last_modified, content_type, body = row
+
+        headers = CaseInsensitiveDict()
+        if etag:
+            headers['ETag'] = etag
+        if last_modified:
+            headers['Last-Modified'] = last_modified
+        if content_type:
+            headers['Content-Type'] = content_type
+        response = requests.Response()
+        response.status_code = 200
+        response.url = final_url
+        response.headers = headers
+        response.encoding = get_encoding_from_headers(headers)
+        response._content = bytes(body)
+        response.from_cache = True
+        return response
+
+    def store(self, url: str, response: requests.Response):
+        """
+        Remember a 200 response that carries a validator; others are not revalidatable.
+
+        A body cut short at the size limit (response.truncated) is not stored,
+        and any older copy is dropped: revalidating it would answer 304 and
+        serve the cut-off copy until the page changes, instead of fetching it again.
+        """
+        if response.status_code != 200:
+            return
+        with self._lock:
+            self.misses += 1
+            if getattr(response, 'truncated', False):
+                self._conn.execute("DELETE FROM responses WHERE url = ?", (url,))
+                self._conn.commit()
+                return
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not (etag or last_modified):
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses"
+                " (url, final_url, etag, last_modified, content_type, body, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, response.url or url, etag, last_modified,
+                 response.headers.get('Content-Type'), response.content, time.time())
+            )
+            excess = self._count() - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE rowid IN "
+                    "(SELECT rowid FROM responses ORDER BY last_used LIMIT ?)",
+                    (excess,)
+                )
+                self.evictions += excess
+            self._conn.commit()
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return entry count, counters and the share of fetches answered with 304."""
+        with self._lock:
+            entries = self._count()
+        fetches = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "not_modified": self.hits,
+            "downloaded": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / fetches if fetches else 0.0
+        }
+
+    def clear(self):
+        """Remove every cached response."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
@@ -1,8 +1,9 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Union
 from pathlib import Path
 from processing.text_processor import TextProcessor
 from processing.text_splitter import TextSplitter
 from vector_store.faiss_store import FAISSStore
+from vector_store.chunks import SourceText
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -24,23 +25,34 @@ class ManualIngestor:
             )
             self.vector_store = FAISSStore(
                 model_name=config.EMBEDDING_MODEL,
-                index_path=config.FAISS_INDEX_PATH
+                index_path=config.FAISS_INDEX_PATH,
+                device=config.EMBEDDING_DEVICE
             )
         return self.text_processor, self.text_splitter, self.vector_store
         
-    def ingest_text(self, text: str) -> None:
-        """Ingest and process a single text document."""
+    def ingest_text(self, text: str, source: Optional[str] = None) -> None:
+        """
+        Ingest and process a single text document.
+        
+        Args:
+            text: Document text
+            source: Optional identifier (e.g. URL or file name); re-ingesting
+                the same source replaces its previous chunks
+        """
         # Get lazy loaded components
         text_processor, text_splitter, vector_store = self._get_components()
         
         # Process the text
         cleaned_text = text_processor.process_document(text)
         
-        # Split into chunks
-        chunks = text_splitter.split_text(cleaned_text)
+        # Split into chunk spans over the cleaned text, which is stored once
+        chunks = SourceText(cleaned_text, source).chunks(text_splitter.split_spans(cleaned_text))
         
         # Add to vector store
-        vector_store.add_documents(chunks)
+        if source is not None:
+            vector_store.delete(source)
+        if chunks:
+            vector_store.add_chunks(chunks, vector_store.encode_documents([chunk.text for chunk in chunks]))
         
     def save_index(self, path: Optional[str] = None):
         """Save the vector store index."""
@@ -51,3 +63,16 @@ class ManualIngestor:
         """Query the vector store for relevant chunks."""
         _, _, vector_store = self._get_components()
         return vector_store.similarity_search(question, k)
+        
+    def query_batch(self, questions: List[str], k: int = 3,
+                    with_citations: bool = False) -> List[List[Union[str, Dict[str, Any]]]]:
+        """
+        Query the vector store for several questions in one batched search.
+        
+        Args:
+            with_citations: Return citation dicts (text, source, title, position, start, end) instead of chunk texts
+        """
+        _, _, vector_store = self._get_components()
+        if with_citations:
+            return vector_store.similarity_search_with_citations_batch(questions, k)
+        return vector_store.similarity_search_batch(questions, k)
@@ -1,103 +1,384 @@
 import requests
-from bs4 import BeautifulSoup
+import urllib3
+from requests.adapters import HTTPAdapter
 from urllib.parse import urljoin, urlparse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 import re
-from typing import Optional, List
+from html import unescape
+import hashlib
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Iterator, Optional, List, Dict, Tuple
+from .crawl_frontier import CrawlFrontier, RobotsPolicy, canonicalize_url, parse_sitemap, url_host
+from .http_cache import HTTPCache
+from .html_extractors import decode_html, get_extractor
+from processing.text_normalizer import PAGE_NORMALIZER
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from config.config import config
+
+# Responses processed as pages; anything else is skipped before its body is read
+HTML_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain')
+# Magic numbers of formats sometimes served without a Content-Type (PDF, PNG, JPEG, GIF, ZIP, gzip, RIFF, Ogg, MP3)
+BINARY_SIGNATURES = (b'%PDF', b'\x89PNG', b'\xff\xd8\xff', b'GIF8', b'PK\x03\x04', b'\x1f\x8b', b'RIFF', b'OggS', b'ID3')
+# The document title, kept as citation metadata; read the same way whichever extractor runs
+TITLE_PATTERN = re.compile(r'<title[^>]*>(.*?)</title>', re.I | re.S)
+
+class SkippedDownload(Exception):
+    """Raised when a response is not worth downloading (wrong content type or too large)."""
+
+@dataclass
+class ScrapedPage:
+    """Result of fetching and parsing one page."""
+    url: str
+    content: str
+    links: List[str] = field(default_factory=list)  # canonical, deduplicated http(s) outlinks
+    not_modified: bool = False  # served from the HTTP cache after a 304
+    title: Optional[str] = None
+
+class HostThrottle:
+    """
+    Per-host politeness for concurrent crawling.
+    
+    At most max_per_host requests to the same host are in flight at once,
+    and consecutive request starts to a host are spaced at least delay
+    seconds apart (or the host's robots.txt Crawl-delay, if longer).
+    """
+    
+    def __init__(self, max_per_host: int, delay: float):
+        self.max_per_host = max_per_host
+        self.delay = delay
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._delays: Dict[str, float] = {}
+        self._next_start: Dict[str, float] = {}
+        self._lock = threading.Lock()
+    
+    def set_delay(self, host: str, delay: float):
+        """Raise the politeness delay for one host."""
+        with self._lock:
+            self._delays[host] = max(delay, self.delay)
+    
+    @contextmanager
+    def acquire(self, url: str):
+        """Hold one of the host's request slots, waiting out the politeness delay first."""
+        host = urlparse(url).netloc
+        with self._lock:
+            slot = self._slots.setdefault(host, threading.BoundedSemaphore(self.max_per_host))
+        slot.acquire()
+        try:
+            # Reserve the next start time for this host, then sleep outside the lock
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(host, now))
+                self._next_start[host] = start + self._delays.get(host, self.delay)
+            if start > now:
+                time.sleep(start - now)
+            yield
+        finally:
+            slot.release()
 
 class WebScraper:
-    def __init__(self):
+    def __init__(self, max_in_flight: int = None, max_per_host: int = None,
+                 politeness_delay: float = None, timeout: float = None,
+                 http_cache_path: str = None, max_bytes: int = None, extractor: str = None):
+        """
+        Args:
+            max_in_flight: Global cap on concurrent requests (1 crawls serially)
+            max_per_host: Cap on concurrent requests to a single host
+            politeness_delay: Minimum seconds between request starts to a host
+            timeout: Per-request timeout in seconds
+            http_cache_path: SQLite file for cached responses (defaults to Config.HTTP_CACHE_PATH)
+            max_bytes: Decoded size cap per page; larger bodies are truncated
+            extractor: HTML extraction backend (defaults to Config.HTML_EXTRACTOR)
+        """
+        self.max_in_flight = max_in_flight or config.CRAWL_MAX_IN_FLIGHT
+        self.timeout = timeout or config.CRAWL_TIMEOUT
+        self.max_bytes = max_bytes or config.CRAWL_MAX_PAGE_BYTES
+        self.extractor = get_extractor(extractor)
+        if politeness_delay is None:
+            politeness_delay = config.CRAWL_POLITENESS_DELAY
+        self.throttle = HostThrottle(max_per_host or config.CRAWL_MAX_PER_HOST, politeness_delay)
+        
         self.session = requests.Session()
+        # Keep one pooled keep-alive connection per concurrent worker
+        adapter = HTTPAdapter(pool_connections=self.max_in_flight, pool_maxsize=self.max_in_flight)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+            # gzip/deflate, plus br and zstd when their decoders are installed
+            'Accept-Encoding': urllib3.util.make_headers(accept_encoding=True)['accept-encoding']
         })
+        # Shared on-disk response cache so re-crawls only download changed pages
+        http_cache_path = http_cache_path or config.HTTP_CACHE_PATH
+        self.http_cache = (
+            HTTPCache.shared(http_cache_path, config.HTTP_CACHE_MAX_ENTRIES)
+            if http_cache_path else None
+        )
+    
+    def _get(self, url: str, accept: Tuple[str, ...] = None, max_bytes: int = None) -> requests.Response:
+        """
+        GET url through the per-host throttle, revalidating any cached copy.
+        
+        Args:
+            url: URL to fetch
+            accept: Content-type prefixes worth downloading; others raise SkippedDownload
+            max_bytes: Cap on the decompressed body size (defaults to Config.CRAWL_MAX_PAGE_BYTES)
+        """
+        key = canonicalize_url(url) if self.http_cache is not None else None
+        headers = self.http_cache.conditional_headers(key) if key else {}
+        response = self._download(url, headers, accept, max_bytes or self.max_bytes)
+        if self.http_cache is not None:
+            if response.status_code == 304:
+                cached = self.http_cache.not_modified(key)
+                if cached is not None:
+                    return cached
+                # Evicted between the lookup and the answer; fetch unconditionally
+                response = self._download(url, {}, accept, max_bytes or self.max_bytes)
+            self.http_cache.store(key, response)
+        return response
+    
+    def _download(self, url: str, headers: Dict[str, str], accept: Optional[Tuple[str, ...]],
+                  max_bytes: int) -> requests.Response:
+        """
+        Stream a GET and keep at most max_bytes of the decoded body.
+        
+        The response headers are checked before any body is read, so a large
+        PDF or video costs one round trip instead of a download.
+        """
+        with self.throttle.acquire(url):
+            response = self.session.get(url, timeout=self.timeout, headers=headers, stream=True)
+            try:
+                content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+                if response.status_code == 200:
+                    if accept and content_type and not content_type.startswith(accept):
+                        raise SkippedDownload(f"content type {content_type}")
+                    declared = response.headers.get('Content-Length', '')
+                    # Content-Length is the encoded size, so the decoded body is at least as large
+                    if declared.isdigit() and int(declared) > max_bytes:
+                        raise SkippedDownload(f"{declared} bytes exceeds the {max_bytes} byte limit")
+                
+                body = bytearray()
+                # Truncated bodies do not match their validators and must not be cached (see HTTPCache.store)
+                response.truncated = False
+                # iter_content transparently decodes gzip / deflate (and br when brotli is installed)
+                for chunk in response.iter_content(chunk_size=64 * 1024):
+                    if not body and accept and not content_type and self._looks_binary(chunk):
+                        raise SkippedDownload("binary content")
+                    body.extend(chunk[:max_bytes - len(body)])
+                    if len(body) >= max_bytes:
+                        print(f"Warning: {url} is larger than {max_bytes} bytes; keeping the first {max_bytes}")
+                        response.truncated = True
+                        break
+                response._content = bytes(body)
+                response._content_consumed = True
+            finally:
+                # Releases the connection; unread bytes of a skipped or truncated body are dropped
+                response.close()
+        return response
+    
+    @staticmethod
+    def _looks_binary(head: bytes) -> bool:
+        """Sniff the first bytes of an untyped response for common binary formats."""
+        return head.startswith(BINARY_SIGNATURES) or b'\x00' in head[:1024]
     
     def scrape_website(self, url: str) -> Optional[str]:
         """Scrape main content from a website URL."""
+        page = self.process_page(url)
+        return page.content if page else None
+    
+    def process_page(self, url: str) -> Optional[ScrapedPage]:
+        """
+        Fetch and parse a page once, returning its main content and outlinks.
+        
+        Returns:
+            ScrapedPage, or None if the page could not be fetched
+        """
         try:
             print(f"Starting to scrape: {url}")
-            response = self.session.get(url, timeout=10)
+            response = self._get(url, accept=HTML_CONTENT_TYPES)
             response.raise_for_status()
             print(f"Successfully fetched URL, status: {response.status_code}")
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Remove unwanted elements
-            for element in soup(['script', 'style', 'nav', 'header', 'footer', 'aside', 'ads']):
-                element.decompose()
-            
-            # Extract main content
-            content = ""
-            
-            # Try to find main content areas
-            main_content = soup.find('main') or soup.find('article') or soup.find('div', class_=re.compile(r'content|main|article'))
-            
-            if main_content:
-                content = self._extract_text_from_element(main_content)
-                print(f"Found main content area, extracted {len(content)} characters")
-            else:
-                # Fallback to body content
-                content = self._extract_text_from_element(soup.find('body'))
-                print(f"Using body content, extracted {len(content)} characters")
-            
-            cleaned_content = self._clean_text(content)
-            print(f"Final cleaned content length: {len(cleaned_content)}")
-            return cleaned_content
+            page = self.parse_html(response.content, url, response.headers.get('Content-Type'),
+                                   base_url=response.url or url)
+            page.not_modified = getattr(response, 'from_cache', False)
+            return page
             
+        except SkippedDownload as e:
+            print(f"Skipping {url}: {e}")
+            return None
         except Exception as e:
             print(f"Error scraping {url}: {e}")
             return None
     
-    def _extract_text_from_element(self, element) -> str:
-        """Extract text from HTML element, preserving structure."""
-        if not element:
-            return ""
+    def parse_html(self, content: bytes, url: str, content_type: Optional[str] = None,
+                   base_url: Optional[str] = None) -> ScrapedPage:
+        """
+        Extract the main content and outlinks of an HTML document.
+        
+        Args:
+            content: Raw HTML bytes
+            url: Identifier of the page (e.g. its URL or a file:// URI)
+            content_type: Content-Type header, used to pick the character set
+            base_url: URL that relative links resolve against (defaults to url)
+        """
+        html = decode_html(content, content_type)
+        text, hrefs = self.extractor.extract(html)
+        links = self._extract_links(hrefs, base_url or url)
         
-        # Get text with proper spacing
-        text = element.get_text(separator=' ', strip=True)
-        return text
+        title = TITLE_PATTERN.search(html)
+        title = ' '.join(unescape(title.group(1)).split()) if title else None
+        
+        cleaned_content = self._clean_text(text)
+        print(f"Extracted {len(cleaned_content)} characters with {self.extractor.name}")
+        return ScrapedPage(url=url, content=cleaned_content, links=links, title=title or None)
+    
+    def _extract_links(self, hrefs: List[str], page_url: str) -> List[str]:
+        """Absolute, canonical http(s) links of a page, deduplicated in document order."""
+        links = {}
+        for href in hrefs:
+            href = href.strip()
+            if not href or href.startswith('#'):
+                continue
+            full_url = urljoin(page_url, href)
+            if urlparse(full_url).scheme not in ('http', 'https'):
+                # mailto:, javascript:, tel: ...
+                continue
+            links.setdefault(canonicalize_url(full_url), None)
+        return list(links)
     
     def _clean_text(self, text: str) -> str:
-        """Clean extracted text."""
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
-        # Remove multiple consecutive punctuation
-        text = re.sub(r'[.]{2,}', '.', text)
-        # Remove extra spaces around punctuation
-        text = re.sub(r'\s+([.,!?])', r'\1', text)
-        return text.strip()
-    
-    def scrape_multiple_pages(self, base_url: str, max_pages: int = 5) -> List[str]:
-        """Scrape multiple pages from a website."""
-        contents = []
+        """Clean extracted text: collapse whitespace and repeated dots, drop spaces before punctuation."""
+        return PAGE_NORMALIZER.normalize(text)
+    
+    def scrape_multiple_pages(self, base_url: str, max_pages: int = 5, max_depth: int = None) -> List[str]:
+        """Crawl a website breadth-first and return the content of up to max_pages pages."""
+        return [page.content for page in self.crawl(base_url, max_pages, max_depth)]
+    
+    def crawl(self, base_url: str, max_pages: int = 5, max_depth: int = None) -> List[ScrapedPage]:
+        """
+        Crawl a website breadth-first and return up to max_pages pages with distinct content.
+        
+        See iter_crawl, which this collects.
+        """
+        return list(self.iter_crawl(base_url, max_pages, max_depth))
+    
+    def iter_crawl(self, base_url: str, max_pages: int = 5, max_depth: int = None) -> Iterator[ScrapedPage]:
+        """
+        Crawl a website breadth-first, yielding up to max_pages pages with distinct content.
+        
+        Starts from base_url (plus the site's sitemap, if any) and follows
+        same-host links up to max_depth links deep, skipping URLs that
+        robots.txt disallows. Each round fetches the next pages in frontier
+        order concurrently and handles their results in that order, so the
+        same site always yields the same pages. Pages are yielded as soon as
+        they are handled, so callers can process them while later pages are
+        still downloading.
+        
+        Args:
+            base_url: Page to start from
+            max_pages: Page budget (pages with new content)
+            max_depth: Maximum link depth from base_url (defaults to Config.CRAWL_MAX_DEPTH)
+        """
+        if max_depth is None:
+            max_depth = config.CRAWL_MAX_DEPTH
+        kept = 0
+        unchanged = 0
+        # Hashes of page content already kept, to drop duplicates served under other URLs
+        content_hashes = set()
         
         try:
-            # Get the base page
-            main_content = self.scrape_website(base_url)
-            if main_content:
-                contents.append(main_content)
+            robots = RobotsPolicy(self._get, self.session.headers['User-Agent']) if config.CRAWL_RESPECT_ROBOTS else None
+            start_url = canonicalize_url(base_url)
+            frontier = CrawlFrontier(max_depth, robots, allowed_hosts={url_host(start_url)})
+            if robots is not None:
+                crawl_delay = robots.crawl_delay(start_url)
+                if crawl_delay:
+                    self.throttle.set_delay(urlparse(start_url).netloc, crawl_delay)
+            if not frontier.add(start_url, 0):
+                print(f"robots.txt disallows crawling {base_url}")
+                return
+            if config.CRAWL_USE_SITEMAP:
+                self._seed_from_sitemaps(start_url, frontier, robots)
             
-            # Try to find additional links (basic implementation)
-            response = self.session.get(base_url, timeout=10)
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Fetch only as many pages as are still needed per round, so no more
+            # requests are sent than a serial crawl would make; rounds are capped
+            # so finished pages are not held back behind a long batch
+            while kept < max_pages and len(frontier):
+                batch = frontier.pop_batch(min(max_pages - kept, 2 * self.max_in_flight))
+                results = self.process_pages([url for url, _ in batch])
+                for (url, depth), page in zip(batch, results):
+                    if page is None:
+                        continue
+                    for link in page.links:
+                        frontier.add(link, depth + 1)
+                    if kept >= max_pages or not page.content:
+                        continue
+                    content_hash = hashlib.sha1(page.content.encode('utf-8')).digest()
+                    if content_hash not in content_hashes:
+                        content_hashes.add(content_hash)
+                        kept += 1
+                        unchanged += page.not_modified
+                        yield page
             
-            base_domain = urlparse(base_url).netloc
-            links_found = 0
-            
-            for link in soup.find_all('a', href=True):
-                if links_found >= max_pages - 1:
-                    break
-                    
-                href = link['href']
-                full_url = urljoin(base_url, href)
-                
-                # Only follow links to the same domain
-                if urlparse(full_url).netloc == base_domain:
-                    content = self.scrape_website(full_url)
-                    if content and content not in contents:
-                        contents.append(content)
-                        links_found += 1
+            if frontier.skipped_robots:
+                print(f"Skipped {frontier.skipped_robots} URL(s) disallowed by robots.txt")
                         
         except Exception as e:
             print(f"Error in multi-page scraping: {e}")
         
-        return contents
+        if unchanged:
+            print(f"{unchanged}/{kept} page(s) unchanged since the last crawl (HTTP 304)")
+    
+    def _seed_from_sitemaps(self, start_url: str, frontier: CrawlFrontier, robots: Optional[RobotsPolicy]):
+        """Queue the page URLs listed in the site's sitemap(s) at depth 1."""
+        parsed = urlparse(start_url)
+        sitemap_urls = robots.sitemaps(start_url) if robots is not None else []
+        if not sitemap_urls:
+            sitemap_urls = [f"{parsed.scheme}://{parsed.netloc}/sitemap.xml"]
+        
+        queued = 0
+        for page_url in self.iter_sitemap(sitemap_urls, config.CRAWL_SITEMAP_MAX_FILES):
+            if queued >= config.CRAWL_SITEMAP_MAX_URLS:
+                break
+            if frontier.add(page_url, 1):
+                queued += 1
+        if queued:
+            print(f"Seeded {queued} URL(s) from sitemap")
+    
+    def iter_sitemap(self, sitemap_urls: List[str], max_files: Optional[int] = None) -> Iterator[str]:
+        """
+        Yield the page URLs listed in sitemaps, following nested sitemap indexes.
+        
+        Args:
+            sitemap_urls: Sitemap or sitemap index URLs to start from
+            max_files: Cap on the sitemap files fetched (None for no cap)
+        """
+        pending = list(sitemap_urls)
+        fetched = 0
+        while pending and (max_files is None or fetched < max_files):
+            sitemap_url = pending.pop(0)
+            fetched += 1
+            try:
+                response = self._get(sitemap_url, max_bytes=config.CRAWL_MAX_SITEMAP_BYTES)
+                if response.status_code != 200:
+                    continue
+                pages, nested = parse_sitemap(response.content)
+            except Exception as e:
+                print(f"Could not read sitemap {sitemap_url}: {e}")
+                continue
+            pending.extend(nested)
+            yield from pages
+    
+    def process_pages(self, urls: List[str]) -> Iterator[Optional[ScrapedPage]]:
+        """Process urls on a thread pool, yielding results in input order as they complete."""
+        if self.max_in_flight <= 1 or len(urls) <= 1:
+            for url in urls:
+                yield self.process_page(url)
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_in_flight, len(urls)), thread_name_prefix="crawl") as pool:
+            yield from pool.map(self.process_page, urls)
@@ -22,6 +22,9 @@ def main():
     summary, success = ingestor.ingest_website(url, max_pages=2)
     
     if success:
+        # Query this site only, not pages left in the saved index by earlier runs
+        ingestor.drop_other_sites(url)
+        
         print("\n📄 WEBSITE SUMMARY:")
         print("=" * 50)
         print(summary)
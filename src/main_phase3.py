@@ -105,6 +105,8 @@ def main():
                 
                 if result['context']:
                     print(f"\n📚 Sources used: {len(result['context'])} relevant chunks")
+                    for citation in result['citations']:
+                        print(f"   - {citation['title'] or citation['source'] or 'Loaded text'}")
         
         except KeyboardInterrupt:
             print("\nGoodbye! 👋")
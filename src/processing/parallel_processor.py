@@ -0,0 +1,128 @@
+import itertools
+import multiprocessing
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
+from .text_processor import TextProcessor
+from .text_splitter import TextSplitter
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from config.config import config
+
+def _clean_and_split(documents: List[str], chunk_size: int, chunk_overlap: int, chunk_tokens: int = 0,
+                     token_overlap: int = 0, tokenizer: str = None) -> List[Tuple[str, List[Tuple[int, int]]]]:
+    """Worker task: clean and split a batch of documents (module level so it can be pickled)."""
+    # The tokenizer is loaded once per worker process and shared by its tasks
+    splitter = TextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, chunk_tokens=chunk_tokens,
+                            token_overlap=token_overlap, tokenizer=tokenizer)
+    cleaned = [TextProcessor.process_document(document) for document in documents]
+    return [(text, splitter.split_spans(text)) for text in cleaned]
+
+class ParallelTextProcessor:
+    """
+    Cleans and splits documents in worker processes for large ingests.
+
+    Cleaning and splitting are pure-Python regex and slicing loops that hold
+    the GIL, so threads cannot run them in parallel. Documents are sent to a
+    process pool in batches of chunksize (one task per batch, amortizing
+    pickling and IPC) and results come back in input order. Each result is
+    the cleaned text plus the (start, end) spans of its chunks, so
+    overlapping chunk text is neither duplicated nor pickled. Below
+    min_documents everything stays in-process, since starting the pool costs
+    more than it saves on small sites.
+    """
+
+    def __init__(self, chunk_size: int = None, chunk_overlap: int = None, workers: Optional[int] = None,
+                 min_documents: int = None, chunksize: int = None):
+        """
+        Args:
+            chunk_size: Characters per chunk (defaults to Config.CHUNK_SIZE)
+            chunk_overlap: Overlap between chunks (defaults to Config.CHUNK_OVERLAP)
+            workers: Worker processes; 0 disables the pool (defaults to Config.PROCESS_POOL_WORKERS)
+            min_documents: Documents handled in-process before the pool is used
+            chunksize: Documents per task sent to a worker
+        """
+        self.chunk_size = chunk_size or config.CHUNK_SIZE
+        self.chunk_overlap = chunk_overlap if chunk_overlap is not None else config.CHUNK_OVERLAP
+        if workers is None:
+            workers = config.PROCESS_POOL_WORKERS
+        if workers is None:
+            # Leave a core for the crawler and the embedding model
+            workers = max(1, (os.cpu_count() or 1) - 1)
+        self.workers = workers
+        self.min_documents = config.PROCESS_POOL_MIN_DOCUMENTS if min_documents is None else min_documents
+        self.chunksize = chunksize or config.PROCESS_POOL_CHUNKSIZE
+        self._splitter = TextSplitter(chunk_size=self.chunk_size, chunk_overlap=self.chunk_overlap)
+        # Workers split exactly like this process, whatever their own config says
+        self._split_args = (self.chunk_size, self.chunk_overlap, self._splitter.chunk_tokens or 0,
+                            self._splitter.token_overlap, self._splitter.tokenizer_name)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Start the pool on first use; it is reused by later ingests."""
+        with self._lock:
+            if self._pool is None:
+                # Forking a process that runs crawler and pipeline threads can deadlock
+                # the child, so workers are started from a clean server process instead
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(method))
+                print(f"Started {self.workers} text processing worker(s)")
+            return self._pool
+
+    def clean_and_split(self, document: str) -> Tuple[str, List[Tuple[int, int]]]:
+        """
+        Clean and split one document in this process.
+
+        Returns:
+            Tuple of (cleaned text, (start, end) character spans of its chunks)
+        """
+        text = TextProcessor.process_document(document)
+        return text, self._splitter.split_spans(text)
+
+    def map(self, documents: List[str]) -> List[Tuple[str, List[Tuple[int, int]]]]:
+        """
+        Clean and split documents.
+
+        Returns:
+            One (cleaned text, chunk spans) pair per document, in input order
+        """
+        if self.workers <= 0 or len(documents) < self.min_documents:
+            return [self.clean_and_split(document) for document in documents]
+        pool = self._get_pool()
+        futures = [
+            pool.submit(_clean_and_split, documents[start:start + self.chunksize], *self._split_args)
+            for start in range(0, len(documents), self.chunksize)
+        ]
+        return [result for future in futures for result in future.result()]
+
+    def imap(self, documents: Iterable[str]) -> Iterator[Tuple[str, List[Tuple[int, int]]]]:
+        """
+        Clean and split documents as they arrive, yielding (cleaned text, chunk spans) in input order.
+
+        The first min_documents are handled in-process as they come, so small
+        ingests never start the pool. After that, documents are grouped into
+        tasks of chunksize; at most two tasks per worker are outstanding, so
+        a slow consumer bounds how much work is buffered.
+        """
+        iterator = iter(documents)
+        for document in itertools.islice(iterator, self.min_documents if self.workers > 0 else None):
+            yield self.clean_and_split(document)
+
+        pending: Deque = deque()
+        for batch in iter(lambda: list(itertools.islice(iterator, self.chunksize)), []):
+            pending.append(self._get_pool().submit(_clean_and_split, batch, *self._split_args))
+            # Pass on finished tasks right away; block only when the window is full
+            while pending and (pending[0].done() or len(pending) >= 2 * self.workers):
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+    def close(self):
+        """Shut the worker processes down."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
@@ -1,4 +1,59 @@
-from typing import Optional
+import re
+import threading
+import numpy as np
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from config.config import config
+
+# Whitespace after a sentence's closing punctuation
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+def textrank(vectors: np.ndarray, damping: float = 0.85, iterations: int = 100, tolerance: float = 1e-6) -> np.ndarray:
+    """
+    Centrality of each vector in their cosine-similarity graph (PageRank over the graph, as in TextRank).
+    
+    Args:
+        vectors: One embedding per row
+        damping: Probability of following an edge rather than jumping to a random node
+        iterations: Maximum power iterations
+        tolerance: Stop once the scores change by less than this in total
+        
+    Returns:
+        Score per row, summing to 1
+    """
+    count = len(vectors)
+    if count == 0:
+        return np.zeros(0, dtype=np.float32)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    unit = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+    similarity = np.clip(unit @ unit.T, 0, None)
+    np.fill_diagonal(similarity, 0)
+    weights = similarity.sum(axis=1, keepdims=True)
+    # A node similar to nothing else passes its score on evenly
+    transition = np.divide(similarity, weights, out=np.full_like(similarity, 1.0 / count), where=weights > 0)
+    scores = np.full(count, 1.0 / count, dtype=np.float32)
+    for _ in range(iterations):
+        updated = (1 - damping) / count + damping * (transition.T @ scores)
+        converged = np.abs(updated - scores).sum() < tolerance
+        scores = updated
+        if converged:
+            break
+    return scores
+
+def _lead_sentence(chunk: str) -> Optional[str]:
+    """The chunk's first whole sentence; chunks often start mid-sentence, after the previous chunk's overlap."""
+    sentences = SENTENCE_BREAK.split(chunk.strip())
+    if sentences and not sentences[0][:1].isupper() and not sentences[0][:1].isdigit():
+        sentences = sentences[1:]
+    for sentence in sentences:
+        # Skip fragments such as headings run into the text, and a sentence cut off by the chunk's end
+        if len(sentence.split()) >= 5 and sentence[-1] in ".!?":
+            return sentence
+    return None
 
 class TextSummarizer:
     def __init__(self):
@@ -33,28 +88,185 @@ class TextSummarizer:
             # Fallback: return first 200 characters
             return text[:200] + "..." if len(text) > 200 else text
     
-    def summarize_website_content(self, contents: list) -> str:
-        """Summarize multiple content pieces from a website."""
-        if not contents:
-            return "No content available to summarize."
+    def summarize_chunks(self, chunks: List[str], vectors: np.ndarray, max_length: int = 200,
+                         redundancy: float = 0.9) -> Optional[str]:
+        """
+        Extractive summary of chunks ranked by centrality over the embeddings they were indexed with.
         
-        if len(contents) == 1:
-            return self.summarize_text(contents[0])
+        The most central chunks each contribute their first whole sentence,
+        skipping chunks nearly identical to one already used, until the summary
+        would pass max_length * 2 characters (the same limit summarize_text
+        truncates at). Sentences keep the chunks' reading order. No model runs:
+        the cost is one similarity matrix over the chunks.
         
-        # Combine and summarize multiple pages
-        combined_text = " ".join(contents)
+        Args:
+            chunks: Chunk texts in reading order (pages in crawl order, chunks in page order)
+            vectors: The chunks' embeddings, one row per chunk
+            max_length: Summary length budget, as for summarize_text
+            redundancy: Cosine similarity above which a chunk counts as a near-duplicate
+            
+        Returns:
+            The summary, or None if no chunk has a usable sentence
+        """
+        if not chunks:
+            return None
+        scores = textrank(vectors)
+        unit = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        budget = max_length * 2
+        picked = {}  # chunk index -> its sentence
+        length = 0
+        for index in np.argsort(-scores, kind="stable").tolist():
+            if picked and (unit[list(picked)] @ unit[index]).max() > redundancy:
+                continue
+            sentence = _lead_sentence(chunks[index])
+            if sentence is None:
+                continue
+            if picked and length + len(sentence) + 1 > budget:
+                break
+            picked[index] = sentence
+            length += len(sentence) + 1
+        if not picked:
+            return None
+        summary = " ".join(picked[index] for index in sorted(picked))
+        if len(summary) > budget:
+            summary = summary[:budget] + "..."
+        return summary
+    
+    def summarize_website_content(self, contents: list, on_summary: Callable[[Any, str], None] = None) -> str:
+        """
+        Summarize multiple content pieces from a website.
         
-        # For very long content, create a hierarchical summary
-        if len(combined_text) > 2000:
-            # First, summarize each page
-            page_summaries = []
+        Args:
+            contents: Page texts
+            on_summary: Called with (page number, page summary) as each page's summary is ready
+        """
+        summary = WebsiteSummary(self, on_summary=on_summary)
+        try:
             for content in contents:
-                page_summary = self.summarize_text(content, max_length=100, min_length=30)
-                if page_summary:
-                    page_summaries.append(page_summary)
+                summary.add(content)
+            return summary.result()
+        finally:
+            summary.close()
+
+class WebsiteSummary:
+    """
+    Map-reduce summary of a website's pages, added one at a time.
+    
+    Map: each page is summarized on a thread pool as soon as it is added,
+    with at most 2 * workers pages in flight (add() waits beyond that), so
+    memory stays bounded however many pages stream through. Every page
+    summary is passed to on_summary as soon as it is ready.
+    
+    Reduce: page summaries are combined fan_in at a time, in page order,
+    and each level's groups are summarized concurrently until one summary
+    is left, so the reduce takes about log(pages) / log(fan_in) sequential
+    steps instead of one pass over everything.
+    
+    A single page is summarized on its own, and a site whose combined text
+    is short is summarized as one text.
+    """
+    
+    # Longer combined content is summarized hierarchically, from per-page summaries
+    SHORT_SITE_CHARS = 2000
+    
+    def __init__(self, summarizer: TextSummarizer, workers: int = None, fan_in: int = None,
+                 on_summary: Callable[[Any, str], None] = None):
+        """
+        Args:
+            summarizer: Summarizes each page and each reduce group (summarize_text)
+            workers: Summarizing threads (defaults to Config.SUMMARY_WORKERS; 0 or 1 summarizes inline)
+            fan_in: Summaries combined per reduce step (defaults to Config.SUMMARY_FAN_IN)
+            on_summary: Called with (page key, page summary) as each page's summary is ready,
+                        from the thread that summarized it; calls never overlap
+        """
+        self.summarizer = summarizer
+        self.workers = config.SUMMARY_WORKERS if workers is None else workers
+        self.fan_in = max(2, fan_in or config.SUMMARY_FAN_IN)
+        self.on_summary = on_summary
+        self.pages = 0
+        self._first_content = None  # kept until a second page arrives
+        self._combined_length = -1  # length of " ".join(contents)
+        self._contents = []         # dropped once the site stops being short
+        self._page_summaries: Dict[int, str] = {}  # page number -> summary
+        self._in_flight = deque()
+        self._error = None          # first error of a page summary that finished in add()
+        self._pool = None
+        self._lock = threading.Lock()
+        
+    def add(self, content: str, key: Any = None):
+        """
+        Add the next page's content and start summarizing it.
+        
+        Args:
+            content: Page text
+            key: Identifies the page to on_summary (e.g. its URL; defaults to the page number)
+        """
+        number = self.pages
+        self.pages += 1
+        self._first_content = content if number == 0 else None
+        self._combined_length += len(content) + 1
+        if self._contents is not None:
+            if self._combined_length <= self.SHORT_SITE_CHARS:
+                self._contents.append(content)
+            else:
+                self._contents = None
+        self._in_flight.append(self._submit(self._summarize_page, number, number if key is None else key, content))
+        # Errors are raised by result(); waiting here must not fail the caller's stage
+        while self._in_flight and (self._in_flight[0].done() or len(self._in_flight) > 2 * max(self.workers, 1)):
+            finished = self._in_flight.popleft()
+            wait([finished])
+            if finished.exception() is not None and self._error is None:
+                self._error = finished.exception()
             
-            # Then summarize the summaries
-            combined_summary = " ".join(page_summaries)
-            return self.summarize_text(combined_summary, max_length=200, min_length=80)
-        else:
-            return self.summarize_text(combined_text, max_length=200, min_length=80)
+    def result(self) -> str:
+        """The summary of every page added so far."""
+        if not self.pages:
+            return "No content available to summarize."
+        
+        if self.pages == 1:
+            return self.summarizer.summarize_text(self._first_content)
+        
+        if self._contents is not None:
+            return self.summarizer.summarize_text(" ".join(self._contents), max_length=200, min_length=80)
+        
+        # For very long content, reduce the per-page summaries level by level
+        while self._in_flight:
+            self._in_flight.popleft().result()
+        if self._error is not None:
+            raise self._error
+        level = [self._page_summaries[number] for number in sorted(self._page_summaries)]
+        while True:
+            groups = [level[i:i + self.fan_in] for i in range(0, len(level), self.fan_in)] or [[]]
+            futures = [self._submit(self._reduce, group) for group in groups]
+            level = [future.result() for future in futures]
+            if len(level) == 1:
+                return level[0]
+                
+    def close(self):
+        """Stop the summarizing threads; summaries still running are abandoned."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            
+    def _submit(self, function: Callable, *args) -> Future:
+        if self.workers <= 1:
+            future = Future()
+            try:
+                future.set_result(function(*args))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="summarize")
+        return self._pool.submit(function, *args)
+        
+    def _summarize_page(self, number: int, key: Any, content: str):
+        page_summary = self.summarizer.summarize_text(content, max_length=100, min_length=30)
+        if page_summary:
+            with self._lock:
+                self._page_summaries[number] = page_summary
+                if self.on_summary is not None:
+                    self.on_summary(key, page_summary)
+                    
+    def _reduce(self, summaries: List[str]) -> Optional[str]:
+        return self.summarizer.summarize_text(" ".join(summaries), max_length=200, min_length=80)
@@ -0,0 +1,101 @@
+import re
+from typing import Dict, List
+
+# Rewritten runs are memoized up to this many distinct runs per pattern set
+RUN_CACHE_SIZE = 4096
+
+class _Patterns:
+    """Compiled patterns for one character model (full Unicode, or ASCII-only text)."""
+
+    def __init__(self, whitespace: str, other_whitespace: str, flags: int, filter_characters: bool):
+        # A spot is where a rule applies: whitespace other than a single space, punctuation after
+        # whitespace, a dot before a dot and (when filtering) a character to drop. Every branch
+        # starts at a character that is neither a word character nor a space, so the scan only
+        # stops at punctuation and symbols; double spaces get a second pattern, used only when
+        # the text has any.
+        checks = [f'(?<={other_whitespace})', f'(?<=[{whitespace}][.,!?])', r'(?<=\.)(?=\.)']
+        if filter_characters:
+            checks.append(f'(?<=[^\\w{whitespace}.,!?])')
+        spot = f'[^\\w ](?:{"|".join(checks)})'
+        self.spot = re.compile(spot, flags)
+        self.spot_or_spaces = re.compile(f'  |{spot}', flags)
+        self.word = re.compile(r'\w', flags)
+        self.run_end = re.compile(r'\W*', flags)
+        self.dropped = re.compile(f'[^{whitespace}.,!?]', flags) if filter_characters else None
+        self.whitespace = re.compile(f'[{whitespace}]+', flags)
+        self.runs: Dict[str, str] = {}
+
+class TextNormalizer:
+    """
+    Single-pass text normalization with precompiled patterns.
+
+    Rules, applied to every run of non-word characters between words:
+        1. Drop characters other than whitespace and . , ! ? (with filter_characters)
+        2. Collapse whitespace to one space
+        3. Remove spaces before . , ! ?
+        4. Collapse repeated dots to one
+    and the result is stripped. Word characters are never touched, so one
+    scan finds the few runs that break a rule and only those are rewritten;
+    text that is already normal is returned as is, without a copy.
+
+    ASCII-only text (checked with str.isascii) is scanned with ASCII-mode
+    patterns, which skip the Unicode character tables.
+    """
+
+    def __init__(self, filter_characters: bool = True, ascii_fast_path: bool = True):
+        """
+        Args:
+            filter_characters: Drop characters that are not word characters, whitespace or . , ! ?
+            ascii_fast_path: Use ASCII-mode patterns for ASCII-only text
+        """
+        self.filter_characters = filter_characters
+        self.ascii_fast_path = ascii_fast_path
+        self._unicode = _Patterns(r'\s', r'[^\S ]', 0, filter_characters)
+        # \s in ASCII mode omits the \x1c-\x1f separators that str.isspace (and Unicode \s) include
+        self._ascii = _Patterns(r'\s\x1c-\x1f', r'[\t\n\r\f\v\x1c-\x1f]', re.ASCII, filter_characters)
+
+    def normalize(self, text: str) -> str:
+        """Normalize text; see the class docstring for the rules."""
+        patterns = self._ascii if self.ascii_fast_path and text.isascii() else self._unicode
+        spots = patterns.spot_or_spaces if '  ' in text else patterns.spot
+        pieces: List[str] = []
+        done = 0
+        for spot in spots.finditer(text):
+            start = spot.start()
+            if start < done:
+                # Inside a run that was already rewritten
+                continue
+            # Widen the spot to the whole run of non-word characters around it
+            end = patterns.run_end.match(text, start).end()
+            while start > done and not patterns.word.match(text, start - 1):
+                start -= 1
+            pieces.append(text[done:start])
+            pieces.append(self._normalize_run(text[start:end], patterns))
+            done = end
+        if not pieces:
+            return text.strip()
+        pieces.append(text[done:])
+        return ''.join(pieces).strip()
+
+    @staticmethod
+    def _normalize_run(run: str, patterns: _Patterns) -> str:
+        # Runs are short and a page repeats the same few ("\n", " ,", "  ") many times
+        normalized = patterns.runs.get(run)
+        if normalized is not None:
+            return normalized
+        normalized = run
+        if patterns.dropped is not None:
+            normalized = patterns.dropped.sub('', normalized)
+        normalized = patterns.whitespace.sub(' ', normalized)
+        for mark in '.,!?':
+            normalized = normalized.replace(' ' + mark, mark)
+        while '..' in normalized:
+            normalized = normalized.replace('..', '.')
+        if len(patterns.runs) < RUN_CACHE_SIZE:
+            patterns.runs[run] = normalized
+        return normalized
+
+# Scraped page text: whitespace and punctuation only, so summaries keep quotes, dashes etc.
+PAGE_NORMALIZER = TextNormalizer(filter_characters=False)
+# Chunking input: also drops characters outside word characters and basic punctuation
+DOCUMENT_NORMALIZER = TextNormalizer(filter_characters=True)
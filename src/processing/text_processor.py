@@ -1,15 +1,16 @@
-import re
 from typing import List
+from .text_normalizer import DOCUMENT_NORMALIZER
 
 class TextProcessor:
     @staticmethod
     def clean_text(text: str) -> str:
-        """Clean and preprocess text."""
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text).strip()
-        # Remove special characters (keep alphanumeric, spaces, and basic punctuation)
-        text = re.sub(r'[^\w\s.,!?]', '', text)
-        return text
+        """
+        Clean and preprocess text.
+
+        Collapses whitespace, tidies punctuation and removes special characters
+        (keeping alphanumerics, spaces and basic punctuation) in one pass.
+        """
+        return DOCUMENT_NORMALIZER.normalize(text)
     
     @staticmethod
     def process_document(text: str) -> str:
@@ -1,42 +1,141 @@
-from typing import List
+import bisect
+import re
+from typing import List, Optional, Tuple
+from .tokenization import Tokenizer, get_tokenizer
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from config.config import config
+
+# Sentence (". ", "! ", "? ") and paragraph ("\n\n") breaks, where token-mode chunks may end
+BREAK_PATTERN = re.compile(r'[.!?] |\n\n')
+
+def _spans(length: int, breaks: List[int], size: int, overlap: int, min_fill: float) -> List[Tuple[int, int]]:
+    """
+    (start, end) token ranges of the chunks.
+
+    Each chunk ends at the last break within size tokens of its start if that
+    leaves more than min_fill tokens, else after exactly size tokens. Chunk
+    ends only ever move forward, so one pass over the sorted breaks finds
+    every cut.
+    """
+    spans = []
+    start = 0
+    next_break = 0
+    while start < length:
+        end = start + size
+        # If this is the last chunk, take whatever remains
+        if end >= length:
+            spans.append((start, length))
+            break
+        while next_break < len(breaks) and breaks[next_break] <= end:
+            next_break += 1
+        if next_break and breaks[next_break - 1] - start > min_fill:  # Only break if we have enough content
+            end = breaks[next_break - 1]
+        spans.append((start, end))
+        start = max(end - overlap, start + 1)
+    return spans
+
+def _stripped(text: str, spans: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Spans narrowed as str.strip() would narrow their text; spans left empty are dropped."""
+    stripped = []
+    for start, end in spans:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            stripped.append((start, end))
+    return stripped
 
 class TextSplitter:
-    def __init__(self, chunk_size: int = None, chunk_overlap: int = None):
+    def __init__(self, chunk_size: int = None, chunk_overlap: int = None, chunk_tokens: Optional[int] = None,
+                 token_overlap: Optional[int] = None, tokenizer: str = None):
+        """
+        Args:
+            chunk_size: Characters per chunk in character mode
+            chunk_overlap: Characters shared by consecutive chunks in character mode
+            chunk_tokens: Token budget per chunk; enables token mode (defaults to Config.CHUNK_TOKENS, 0 disables)
+            token_overlap: Tokens shared by consecutive chunks (defaults to Config.CHUNK_TOKEN_OVERLAP)
+            tokenizer: Tokenizer backend for token mode (defaults to Config.CHUNK_TOKENIZER)
+        """
         self.chunk_size = chunk_size or 1000
         self.chunk_overlap = chunk_overlap or 200
-        
+        self.chunk_tokens = config.CHUNK_TOKENS if chunk_tokens is None else chunk_tokens
+        self.token_overlap = config.CHUNK_TOKEN_OVERLAP if token_overlap is None else token_overlap
+        self.tokenizer_name = tokenizer or config.CHUNK_TOKENIZER
+        self._tokenizer: Optional[Tokenizer] = None
+
+    @property
+    def tokenizer(self) -> Tokenizer:
+        """Tokenizer used in token mode, loaded on first use."""
+        if self._tokenizer is None:
+            self._tokenizer = get_tokenizer(self.tokenizer_name)
+        return self._tokenizer
+
     def split_text(self, text: str) -> List[str]:
-        """Split text into chunks with overlap."""
+        """
+        Split text into chunks with overlap.
+
+        In character mode chunks hold at most chunk_size characters; in token
+        mode at most chunk_tokens tokens, counted on the tokenization of the
+        whole text. Either way a chunk ends at the last sentence or paragraph
+        break in its window when that break is past 70% of the window.
+        """
+        return [text[start:end] for start, end in self.split_spans(text)]
+
+    def split_spans(self, text: str) -> List[Tuple[int, int]]:
+        """
+        (start, end) character spans of the chunks split_text returns, without copying any text.
+        """
+        if self.chunk_tokens:
+            return self._token_spans(text)
         if len(text) <= self.chunk_size:
-            return [text]
+            return [(0, len(text))]
             
-        chunks = []
+        spans = []
         start = 0
+        # Breaks before this offset into the window leave too little content
+        min_break = int(self.chunk_size * 0.7) + 1
         
         while start < len(text):
             end = start + self.chunk_size
             
             # If this is the last chunk, take whatever remains
             if end >= len(text):
-                chunks.append(text[start:])
+                spans.append((start, len(text)))
                 break
                 
-            # Try to find a good breaking point (sentence or paragraph)
-            chunk = text[start:end]
-            
-            # Look for sentence endings
+            # Look for the last sentence or paragraph ending in the window's tail; bounded
+            # searches neither copy the window nor scan more than its last 30%
             sentence_end = max(
-                chunk.rfind('. '),
-                chunk.rfind('! '),
-                chunk.rfind('? '),
-                chunk.rfind('\n\n')
+                text.rfind('. ', start + min_break, end),
+                text.rfind('! ', start + min_break, end),
+                text.rfind('? ', start + min_break, end),
+                text.rfind('\n\n', start + min_break, end)
             )
             
-            if sentence_end > self.chunk_size * 0.7:  # Only break if we have enough content
-                end = start + sentence_end + 2
-                chunk = text[start:end]
+            if sentence_end >= 0:
+                end = sentence_end + 2
             
-            chunks.append(chunk)
+            spans.append((start, end))
             start = end - self.chunk_overlap
             
-        return [chunk.strip() for chunk in chunks if chunk.strip()]
+        return _stripped(text, spans)
+
+    def _token_spans(self, text: str) -> List[Tuple[int, int]]:
+        starts = self.tokenizer.token_starts(text)
+        if len(starts) <= self.chunk_tokens:
+            return [(0, len(text))]
+
+        # Cut before the first token after the break's punctuation mark or first newline;
+        # breaks come in text order, so each search starts where the previous one ended
+        breaks = []
+        token = 0
+        for match in BREAK_PATTERN.finditer(text):
+            token = bisect.bisect_left(starts, match.start() + 1, token)
+            breaks.append(token)
+
+        bounds = starts + [len(text)]
+        spans = _spans(len(starts), breaks, self.chunk_tokens, self.token_overlap, self.chunk_tokens * 0.7)
+        return _stripped(text, [(bounds[start], bounds[end]) for start, end in spans])
@@ -0,0 +1,148 @@
+import importlib.util
+import re
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, List, Type
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from config.config import config
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+class Tokenizer(ABC):
+    """
+    Splits text into model tokens and reports where each token starts.
+
+    Token-mode chunking only needs the character offset of every token, so
+    chunk boundaries can be mapped back onto the original text without
+    decoding anything.
+    """
+
+    name = None
+
+    @classmethod
+    def available(cls) -> bool:
+        """Whether the backend's library is installed."""
+        return True
+
+    @abstractmethod
+    def token_starts(self, text: str) -> List[int]:
+        """
+        Args:
+            text: Text to tokenize (special tokens are not added)
+
+        Returns:
+            Character offset of each token's start, in increasing order
+        """
+        raise NotImplementedError
+
+    def count(self, text: str) -> int:
+        """Number of tokens in text."""
+        return len(self.token_starts(text))
+
+class EmbedderTokenizer(Tokenizer):
+    """The embedding model's own (fast) tokenizer, so budgets match what the embedder truncates."""
+
+    name = "embedder"
+
+    def __init__(self, model_name: str = None):
+        # Imported here: transformers is slow to import and worker processes may never need it
+        from transformers import AutoTokenizer
+        self._tokenizer = AutoTokenizer.from_pretrained(model_name or config.EMBEDDING_MODEL, use_fast=True)
+        # Whole pages are tokenized at once; the model's length limit applies to chunks, not here
+        self._tokenizer.model_max_length = sys.maxsize
+
+    @classmethod
+    def available(cls) -> bool:
+        return importlib.util.find_spec("transformers") is not None
+
+    def token_starts(self, text: str) -> List[int]:
+        encoding = self._tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)
+        return [start for start, _ in encoding["offset_mapping"]]
+
+    def count(self, text: str) -> int:
+        return len(self._tokenizer(text, add_special_tokens=False)["input_ids"])
+
+class TiktokenTokenizer(Tokenizer):
+    """OpenAI's BPE tokenizer (cl100k_base); a close stand-in when the embedder's tokenizer cannot load."""
+
+    name = "tiktoken"
+
+    def __init__(self, encoding: str = "cl100k_base"):
+        self._encoding = tiktoken.get_encoding(encoding)
+
+    @classmethod
+    def available(cls) -> bool:
+        return tiktoken is not None
+
+    def token_starts(self, text: str) -> List[int]:
+        _, offsets = self._encoding.decode_with_offsets(self._encoding.encode_ordinary(text))
+        return offsets
+
+    def count(self, text: str) -> int:
+        return len(self._encoding.encode_ordinary(text))
+
+class RegexTokenizer(Tokenizer):
+    """
+    Dependency-free approximation: punctuation marks and word pieces of up to
+    four characters. Subword tokenizers split rare and long words further than
+    whole words, so counting pieces errs towards more tokens, keeping chunks
+    within the budget of the real tokenizer in practice.
+    """
+
+    name = "regex"
+    PATTERN = re.compile(r'\w{1,4}|[^\w\s]')
+
+    def token_starts(self, text: str) -> List[int]:
+        return [match.start() for match in self.PATTERN.finditer(text)]
+
+TOKENIZERS: Dict[str, Type[Tokenizer]] = {
+    cls.name: cls for cls in (EmbedderTokenizer, TiktokenTokenizer, RegexTokenizer)
+}
+# Order tried by "auto", most faithful to the embedder first
+_PREFERENCE = ("embedder", "tiktoken", "regex")
+
+_loaded: Dict[str, Tokenizer] = {}
+_lock = threading.Lock()
+
+def available_tokenizers() -> List[str]:
+    """Names of the backends whose libraries are installed."""
+    return [name for name, cls in TOKENIZERS.items() if cls.available()]
+
+def get_tokenizer(name: str = None) -> Tokenizer:
+    """
+    Return a shared tokenizer backend, loading it on first use in this process.
+
+    Args:
+        name: "embedder", "tiktoken", "regex" or "auto" (first one that loads);
+              defaults to Config.CHUNK_TOKENIZER
+
+    Returns:
+        Tokenizer instance; falls back along "auto"'s order if the backend
+        is not installed or cannot be loaded (e.g. the model is not cached offline);
+        RuntimeError if no candidate loads
+    """
+    name = (name or config.CHUNK_TOKENIZER).lower()
+    if name != "auto" and name not in TOKENIZERS:
+        raise ValueError(f"Unknown tokenizer '{name}', expected one of {('auto',) + tuple(TOKENIZERS)}")
+    with _lock:
+        if name in _loaded:
+            return _loaded[name]
+        candidates = _PREFERENCE if name == "auto" else (name,) + _PREFERENCE[_PREFERENCE.index(name) + 1:]
+        for candidate in candidates:
+            if not TOKENIZERS[candidate].available():
+                continue
+            try:
+                tokenizer = TOKENIZERS[candidate]()
+            except Exception as e:
+                print(f"Warning: Could not load the {candidate} tokenizer: {e}")
+                continue
+            if name != "auto" and candidate != name:
+                print(f"Warning: Tokenizer '{name}' is unavailable, falling back to {candidate}")
+            _loaded[name] = tokenizer
+            return tokenizer
+    raise RuntimeError(f"Could not load tokenizer '{name}' or any fallback ({', '.join(candidates)})")
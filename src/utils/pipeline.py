@@ -0,0 +1,211 @@
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_END = object()
+
+class _Cancelled(BaseException):
+    """
+    Raised inside a stage thread when another stage failed or the consumer stopped.
+
+    A BaseException so stage code catching Exception does not swallow it.
+    """
+
+class StageStats:
+    """Counters for one pipeline stage."""
+
+    def __init__(self, name: str, unit: str):
+        self.name = name
+        self.unit = unit
+        self.items = 0
+        self.busy = 0.0       # seconds spent working, excluding waits on either queue
+        self.elapsed = 0.0    # seconds from the stage's start to its end
+        self.done = False
+
+    @property
+    def throughput(self) -> float:
+        """Items per busy second: what the stage could sustain if never starved or blocked."""
+        return self.items / self.busy if self.busy else 0.0
+
+    @property
+    def utilization(self) -> float:
+        """Share of the stage's lifetime spent working; the bottleneck is close to 1."""
+        return self.busy / self.elapsed if self.elapsed else 0.0
+
+class Pipeline:
+    """
+    Streams items through generator stages running on their own threads.
+
+    Stages are connected by bounded queues, so a slow stage blocks the
+    ones feeding it instead of letting work pile up: at most queue_size
+    items wait between any two stages, however large the input is. Each
+    stage is a function that takes an iterator of inputs and yields
+    outputs, so it can map, filter or batch. The first stage pulls from the
+    source itself, so time spent producing source items (e.g. fetching
+    pages) counts as its work. The last stage's outputs are yielded to the
+    caller, which acts as the final stage on its own thread.
+
+    An exception in any stage stops the others and is re-raised to the caller.
+    """
+
+    def __init__(self, queue_size: int = 8):
+        self.queue_size = queue_size
+        self._stages: List[tuple] = []
+        self.stats: List[StageStats] = []
+        self._stop = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def add_stage(self, name: str, fn: Callable[[Iterator[Any]], Iterable[Any]],
+                  unit: str = "items", size: Callable[[Any], int] = None) -> "Pipeline":
+        """
+        Append a stage.
+
+        Args:
+            name: Label used in progress output
+            fn: Transforms an iterator of inputs into an iterable of outputs
+            unit: What the stage's outputs are counted in
+            size: Units in one output (defaults to 1 per output)
+        """
+        self._stages.append((fn, size))
+        self.stats.append(StageStats(name, unit))
+        return self
+
+    def run(self, source: Iterable[Any]) -> Iterator[Any]:
+        """Feed source through the stages, yielding the last stage's outputs as they are ready."""
+        queues = [queue.Queue(self.queue_size) for _ in self._stages]
+        threads = []
+        upstream: Iterable[Any] = source
+        for position, ((fn, size), stats, out) in enumerate(zip(self._stages, self.stats, queues)):
+            thread = threading.Thread(target=self._run_stage, args=(fn, size, stats, upstream, out, position > 0),
+                                      name=f"pipeline-{stats.name}", daemon=True)
+            threads.append(thread)
+            upstream = self._drain(out)
+        for thread in threads:
+            thread.start()
+        try:
+            for item in upstream:
+                yield item
+        except _Cancelled:
+            pass
+        finally:
+            # Also reached when the caller stops iterating early
+            self._stop.set()
+            for thread in threads:
+                thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def _run_stage(self, fn, size, stats: StageStats, inputs: Iterable[Any], out: queue.Queue,
+                   inputs_queued: bool):
+        started = time.perf_counter()
+        waited = [0.0]
+
+        def timed_inputs():
+            iterator = iter(inputs)
+            if not inputs_queued:
+                yield from iterator
+                return
+            while True:
+                wait_started = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    waited[0] += time.perf_counter() - wait_started
+                yield item
+
+        try:
+            for item in fn(timed_inputs()):
+                wait_started = time.perf_counter()
+                self._put(out, item)
+                waited[0] += time.perf_counter() - wait_started
+                stats.items += size(item) if size else 1
+                stats.elapsed = time.perf_counter() - started
+                stats.busy = stats.elapsed - waited[0]
+        except _Cancelled:
+            pass
+        except BaseException as e:
+            if self._error is None:
+                self._error = e
+            self._stop.set()
+        finally:
+            stats.elapsed = time.perf_counter() - started
+            stats.busy = stats.elapsed - waited[0]
+            stats.done = True
+            try:
+                self._put(out, _END)
+            except _Cancelled:
+                pass
+
+    def _put(self, out: queue.Queue, item: Any):
+        # Poll so a blocked producer notices when the pipeline is stopped
+        while True:
+            if self._stop.is_set() and item is not _END:
+                raise _Cancelled()
+            try:
+                out.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if self._stop.is_set():
+                    raise _Cancelled()
+
+    def _drain(self, inbox: queue.Queue) -> Iterator[Any]:
+        while True:
+            try:
+                item = inbox.get(timeout=0.1)
+            except queue.Empty:
+                if self._stop.is_set():
+                    raise _Cancelled()
+                continue
+            if item is _END:
+                return
+            yield item
+
+    def progress(self) -> Dict[str, int]:
+        """Units produced so far by each stage."""
+        return {stats.name: stats.items for stats in self.stats}
+
+    def report(self) -> str:
+        """Per-stage output, throughput per busy second and utilization as a small table."""
+        lines = [f"{'stage':<12} {'output':>14} {'throughput':>12} {'busy':>8} {'util':>5}"]
+        for stats in self.stats:
+            lines.append(f"{stats.name:<12} {stats.items:>7} {stats.unit:<6} {stats.throughput:>10.1f}/s "
+                         f"{stats.busy:>7.2f}s {stats.utilization:>5.0%}")
+        return "\n".join(lines)
+
+def rebatch(documents: Iterable[Tuple[Any, List[Any]]], batch_size: int) -> Iterator[Tuple[List[Any], List[Any], List[Any]]]:
+    """
+    Regroup per-document item lists into fixed-size batches that span documents.
+
+    Args:
+        documents: (key, items) pairs, e.g. (page URL, chunks)
+        batch_size: Items per batch; the last batch may be smaller
+
+    Yields:
+        Tuples of (items, the key of each item, keys of the documents completed
+        by this batch). A document is completed by the batch holding its last
+        item; documents without items complete with the next batch.
+    """
+    items, keys, ends = [], [], deque()
+
+    def take(count):
+        batch_items, batch_keys = items[:count], keys[:count]
+        del items[:count], keys[:count]
+        finished = []
+        while ends and ends[0][1] <= count:
+            finished.append(ends.popleft()[0])
+        for position, (key, end) in enumerate(ends):
+            ends[position] = (key, end - count)
+        return batch_items, batch_keys, finished
+
+    for key, document_items in documents:
+        items.extend(document_items)
+        keys.extend([key] * len(document_items))
+        ends.append((key, len(items)))
+        while len(items) >= batch_size:
+            yield take(batch_size)
+    if items or ends:
+        yield take(len(items))
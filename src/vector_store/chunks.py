@@ -0,0 +1,60 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+class SourceText:
+    """
+    A cleaned document (e.g. one page's main text) that chunks point into.
+
+    Chunks of the same document hold a reference to one SourceText, so
+    overlapping chunks share its text instead of each keeping a copy, and
+    segments store the text once however many chunks cover it.
+    """
+
+    __slots__ = ("text", "source", "title")
+
+    def __init__(self, text: str, source: Optional[str] = None, title: Optional[str] = None):
+        self.text = text
+        self.source = source
+        self.title = title
+
+    def chunks(self, spans: List[Tuple[int, int]]) -> List["Chunk"]:
+        """Chunks for (start, end) character spans, numbered in order."""
+        return [Chunk(self, start, end, position) for position, (start, end) in enumerate(spans)]
+
+class Chunk:
+    """
+    A (start, end) character span of a SourceText plus its position among the document's chunks.
+
+    The chunk's text is only sliced out when asked for, e.g. to embed it.
+    """
+
+    __slots__ = ("document", "start", "end", "position")
+
+    def __init__(self, document: SourceText, start: int, end: int, position: Optional[int] = None):
+        self.document = document
+        self.start = start
+        self.end = end
+        self.position = position
+
+    @classmethod
+    def from_text(cls, text: str, source: Optional[str] = None) -> "Chunk":
+        """A chunk that is its own document, for callers that only have chunk strings."""
+        return cls(SourceText(text, source), 0, len(text))
+
+    @property
+    def text(self) -> str:
+        return self.document.text[self.start:self.end]
+
+    @property
+    def source(self) -> Optional[str]:
+        return self.document.source
+
+    def citation(self) -> Dict[str, Any]:
+        """Text and provenance of the chunk, as returned with search results."""
+        return {
+            "text": self.text,
+            "source": self.document.source,
+            "title": self.document.title,
+            "position": self.position,
+            "start": self.start,
+            "end": self.end,
+        }
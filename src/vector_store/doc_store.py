@@ -0,0 +1,117 @@
+import os
+import mmap
+import numpy as np
+from typing import Iterable, Iterator, List
+
+class DocumentStore:
+    """
+    Append-only document list persisted as one UTF-8 blob plus an int64 offsets array.
+
+    On disk:
+        <path>.docs.bin          - all documents concatenated as UTF-8
+        <path>.docs.offsets.npy  - int64 array of n + 1 byte offsets into the blob
+
+    Loading memory-maps both files, so it is O(1) regardless of corpus size
+    and pages are shared between worker processes. Documents added after
+    loading are kept in memory until the next save. Documents may contain
+    any characters, including newlines.
+    """
+
+    def __init__(self):
+        self._blob = None                 # mmap of the .docs.bin file
+        self._blob_view = None            # memoryview over the mmap
+        self._offsets = np.zeros(1, dtype=np.int64)
+        self._pending: List[str] = []     # documents added since the last load/save
+
+    @staticmethod
+    def blob_path(path: str) -> str:
+        return f"{path}.docs.bin"
+
+    @staticmethod
+    def offsets_path(path: str) -> str:
+        return f"{path}.docs.offsets.npy"
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        """Whether a binary document store has been saved at path."""
+        return os.path.exists(cls.blob_path(path)) and os.path.exists(cls.offsets_path(path))
+
+    @property
+    def _stored_count(self) -> int:
+        return len(self._offsets) - 1
+
+    def __len__(self) -> int:
+        return self._stored_count + len(self._pending)
+
+    def get_bytes(self, i: int) -> memoryview:
+        """Zero-copy view of the UTF-8 bytes of a stored document."""
+        return self._blob_view[self._offsets[i]:self._offsets[i + 1]]
+
+    def __getitem__(self, i: int) -> str:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("document index out of range")
+        if i >= self._stored_count:
+            return self._pending[i - self._stored_count]
+        # Only this document's bytes are touched, the rest of the blob stays on disk
+        return str(self.get_bytes(i), "utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        for i in range(len(self)):
+            yield self[i]
+
+    def append(self, text: str):
+        self._pending.append(text)
+
+    def extend(self, texts: Iterable[str]):
+        self._pending.extend(texts)
+
+    def save(self, path: str):
+        """Write the blob and offsets, replacing any previous files atomically."""
+        blob_file = self.blob_path(path)
+        offsets_file = self.offsets_path(path)
+        pending = [text.encode("utf-8") for text in self._pending]
+        lengths = np.fromiter((len(b) for b in pending), dtype=np.int64, count=len(pending))
+        offsets = np.concatenate([self._offsets, self._offsets[-1] + np.cumsum(lengths)])
+
+        # Write to temp files first: the current files may be memory-mapped by us
+        # or by other processes, and must not be truncated underneath them
+        with open(f"{blob_file}.tmp", "wb") as f:
+            if self._stored_count:
+                f.write(self._blob_view[:self._offsets[-1]])
+            for b in pending:
+                f.write(b)
+        with open(f"{offsets_file}.tmp", "wb") as f:
+            np.save(f, offsets)
+        os.replace(f"{blob_file}.tmp", blob_file)
+        os.replace(f"{offsets_file}.tmp", offsets_file)
+
+        # Re-open so the just-saved documents are served from the mapping too
+        self._open(path)
+
+    @classmethod
+    def load(cls, path: str) -> "DocumentStore":
+        """Memory-map a saved document store."""
+        store = cls()
+        store._open(path)
+        return store
+
+    def _open(self, path: str):
+        # Any previous mapping is closed by the GC once no views into it remain
+        self._offsets = np.load(self.offsets_path(path), mmap_mode="r")
+        self._pending = []
+        self._blob = None
+        if self._stored_count and self._offsets[-1] > 0:
+            with open(self.blob_path(path), "rb") as f:
+                self._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._blob_view = memoryview(self._blob)
+        else:
+            # mmap cannot map empty files; every stored document is empty
+            self._blob_view = memoryview(b"")
+
+    @classmethod
+    def from_texts(cls, texts: Iterable[str]) -> "DocumentStore":
+        store = cls()
+        store.extend(texts)
+        return store
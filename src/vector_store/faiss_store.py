@@ -2,89 +2,500 @@ import os
 import numpy as np
 import faiss
 import torch
-from sentence_transformers import SentenceTransformer
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 from pathlib import Path
+from utils.lru_cache import LRUCache
+from .model_registry import model_registry
+from .warmup import warmup
+from .index_factory import IndexFactory
+from .doc_store import DocumentStore
+from .chunks import Chunk
+from .embedding_cache import EmbeddingCache
+from .segment_store import SegmentStore
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from config.config import config
 
 class FAISSStore:
-    def __init__(self, model_name: str = None, index_path: str = None):
+    def __init__(self, model_name: str = None, index_path: str = None, device: str = None,
+                 query_cache_size: int = None, index_type: str = None,
+                 embedding_cache_path: str = None, precision: str = None,
+                 rerank_factor: int = None):
         # Initialize model with proper device handling to avoid meta tensor issues
         self.model_name = model_name or "sentence-transformers/all-mpnet-base-v2"
+        self.device = device or "cpu"
         self.model = None
         self.index = None
         self.index_path = index_path
-        self.documents = []
+        # Documents and raw vectors, persisted as append-only segments
+        self.segments = SegmentStore()
+        # Set while self.index is a read-only memory map of this file
+        self._mmap_index_file = None
+        # Set when the in-memory index differs from the saved snapshot beyond appended rows
+        self._snapshot_stale = False
+        # Deleted ids still physically present in self.index (e.g. HNSW cannot remove)
+        self._dead_in_index = set()
+        self._exclusion = (None, -1, None)  # (index, dead count, search params) cache
+        # Normalized query -> embedding, so repeated questions skip the model
+        if query_cache_size is None:
+            query_cache_size = config.QUERY_CACHE_SIZE
+        self.query_cache = LRUCache(query_cache_size)
+        self.index_factory = IndexFactory(index_type, precision=precision)
+        # Candidates per result re-scored with exact float32 vectors when the index is lossy
+        self.rerank_factor = config.RERANK_FACTOR if rerank_factor is None else rerank_factor
+        # On-disk (model, chunk hash) -> vector cache shared by every store in the process
+        embedding_cache_path = embedding_cache_path or config.EMBEDDING_CACHE_PATH
+        self.embedding_cache = (
+            EmbeddingCache.shared(embedding_cache_path, config.EMBEDDING_CACHE_MAX_ENTRIES)
+            if embedding_cache_path else None
+        )
+        
+    @property
+    def documents(self) -> SegmentStore:
+        """Stored chunks, indexable by FAISS row number."""
+        return self.segments
         
     def _get_model(self):
-        """Lazy load model to avoid initialization issues"""
+        """Lazy load the shared model from the process-wide registry"""
         if self.model is None:
-            try:
-                print("Loading SentenceTransformer model...")
-                # Force CPU device and avoid meta tensor issues
-                self.model = SentenceTransformer(self.model_name, device='cpu')
-                # Ensure model is properly initialized
-                self.model.eval()
-                print(f"Model loaded successfully: {self.model_name}")
-                
-                # Test the model with a simple embedding
-                test_embedding = self.model.encode("test", device='cpu')
-                print(f"Test embedding shape: {test_embedding.shape}")
-                
-            except Exception as e:
-                print(f"Error loading model: {e}")
-                import traceback
-                traceback.print_exc()
-                raise
+            # Let a background warm-up finish its first forward pass rather than racing it
+            if not warmup.wait(self.model_name, self.device):
+                print("Warning: model warm-up is taking too long; loading directly")
+            self.model = model_registry.get_model(self.model_name, self.device)
         return self.model
         
     def _create_index(self, dimension: int):
-        """Create a new FAISS index."""
-        self.index = faiss.IndexFlatL2(dimension)
+        """Create a new FAISS index of the configured type."""
+        self.index = self.index_factory.create_initial(dimension)
+        
+    def _ensure_writable_index(self):
+        """Replace a memory-mapped (read-only) index with an in-RAM copy before mutating it."""
+        if self._mmap_index_file is not None:
+            self.index = faiss.read_index(self._mmap_index_file)
+            self.index_factory.configure(self.index)
+            self._mmap_index_file = None
         
-    def add_documents(self, texts: List[str]):
-        """Add documents to the vector store."""
+    def _maybe_upgrade_index(self):
+        """Switch from the buffering Flat index to a trained IVF index once enough vectors exist."""
+        if self.index_factory.should_upgrade(self.index):
+            self.index = self.index_factory.upgrade(self.index)
+            self._mmap_index_file = None
+            self._snapshot_stale = True
+        
+    def add_documents(self, texts: List[str], source: Optional[str] = None):
+        """
+        Add documents to the vector store.
+        
+        Args:
+            texts: Chunks to embed and index
+            source: Where the chunks came from (e.g. page URL), used by delete/upsert
+        """
         if not texts:
             return
+        self.add_embeddings(texts, self.encode_documents(texts), source=source)
+        
+    def add_embeddings(self, texts: List[str], embeddings: np.ndarray, source: Optional[str] = None,
+                       sources: Optional[List[Optional[str]]] = None) -> np.ndarray:
+        """
+        Index chunks whose embeddings were already computed with encode_documents.
+        
+        Args:
+            texts: Chunks
+            embeddings: Their embeddings, one row per chunk
+            source: Source of every chunk
+            sources: One source per chunk, for batches spanning several documents
             
-        # Generate embeddings using lazy loaded model
-        model = self._get_model()
-        embeddings = model.encode(texts, show_progress_bar=True, device='cpu')
+        Returns:
+            The stable ids assigned to the chunks
+        """
+        if sources is None:
+            sources = [source] * len(texts)
+        return self.add_chunks([Chunk.from_text(text, source) for text, source in zip(texts, sources)], embeddings)
         
+    def add_chunks(self, chunks: List[Chunk], embeddings: np.ndarray) -> np.ndarray:
+        """
+        Index span chunks whose embeddings were already computed.
+        
+        Chunks of one document share its SourceText, which is stored once;
+        its source, title and each chunk's position are kept as citation
+        metadata.
+        
+        Args:
+            chunks: Chunks, e.g. from SourceText.chunks
+            embeddings: Their embeddings, one row per chunk
+            
+        Returns:
+            The stable ids assigned to the chunks
+        """
         # Create index if it doesn't exist
         if self.index is None:
             self._create_index(embeddings.shape[1])
+        else:
+            self._ensure_writable_index()
             
-        # Add to FAISS index
-        self.index.add(np.array(embeddings).astype('float32'))
-        self.documents.extend(texts)
+        # Add to FAISS index under the chunks' stable ids
+        ids = self.segments.append(chunks, embeddings)
+        self.index.add_with_ids(np.array(embeddings).astype('float32'), ids)
+        self._maybe_upgrade_index()
+        return ids
+        
+    def delete(self, source: Optional[str]) -> int:
+        """
+        Delete every chunk that came from source.
+        
+        Chunks are tombstoned in the segment store (and removed from the
+        index where the index type supports it); compact() reclaims their
+        space on disk.
+        
+        Returns:
+            Number of chunks deleted
+        """
+        return self.delete_ids(self.ids_for_source(source))
+        
+    def delete_ids(self, ids: np.ndarray) -> int:
+        """Delete chunks by stable id; returns how many were deleted."""
+        ids = np.asarray(ids, dtype=np.int64)
+        if not len(ids):
+            return 0
+        deleted = self.segments.delete_ids(ids)
+        if deleted and self.index is not None:
+            self._ensure_writable_index()
+            try:
+                self.index.remove_ids(ids)
+            except RuntimeError:
+                # e.g. HNSW graphs cannot drop nodes; exclude the ids at search time instead
+                self._dead_in_index.update(ids.tolist())
+        return deleted
+        
+    def ids_for_source(self, source: Optional[str]) -> np.ndarray:
+        """Stable ids of the live chunks that came from source."""
+        return self.segments.ids_for_source(source)
+        
+    def source_chunks(self, source: Optional[str]) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+        """
+        Live chunks that came from source, with the vectors they were indexed with.
+        
+        Returns:
+            Tuple of (citation dicts in the order the chunks were added, float32 vectors, one row per chunk)
+        """
+        rows = [row for row in self.segments.rows_for_ids(self.ids_for_source(source)) if row >= 0]
+        if not rows:
+            return [], np.zeros((0, 0), dtype=np.float32)
+        return [self.segments.citation(row) for row in rows], self.segments.vectors_for_rows(rows)
+        
+    def upsert(self, source: str, chunks: List[str]) -> Tuple[int, int]:
+        """
+        Replace all chunks from source with new ones.
+        
+        Only this source's chunks are embedded and indexed, so refreshing one
+        page costs that page alone.
+        
+        Returns:
+            Tuple of (chunks deleted, chunks added)
+        """
+        deleted = self.delete(source)
+        self.add_documents(chunks, source=source)
+        return deleted, len(chunks)
+        
+    def sources(self):
+        """Sources that currently have chunks in the store."""
+        return self.segments.sources()
+        
+    def encode_documents(self, texts: List[str], show_progress: bool = True) -> np.ndarray:
+        """Embed chunks, encoding only those missing from the embedding cache."""
+        if self.embedding_cache is None:
+            # Generate embeddings using lazy loaded model
+            model = self._get_model()
+            return np.asarray(model.encode(texts, show_progress_bar=show_progress, device=self.device), dtype='float32')
+        
+        cached = self.embedding_cache.get_many(self.model_name, texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, cached) if vector is None))
+        print(f"Embedding cache: {len(texts) - sum(v is None for v in cached)}/{len(texts)} chunks cached, encoding {len(missing)}")
+        
+        if missing:
+            model = self._get_model()
+            encoded = np.asarray(model.encode(missing, show_progress_bar=show_progress, device=self.device), dtype='float32')
+            self.embedding_cache.put_many(self.model_name, missing, encoded)
+            fresh = dict(zip(missing, encoded))
+            cached = [fresh[text] if vector is None else vector for text, vector in zip(texts, cached)]
+        
+        return np.vstack(cached)
+        
+    def embedding_cache_stats(self):
+        """Return persistent embedding cache size, counters and hit ratio."""
+        return self.embedding_cache.stats() if self.embedding_cache is not None else None
+        
+    @staticmethod
+    def _normalize_query(query: str) -> str:
+        """Normalize a query for cache lookups (collapse and trim whitespace)."""
+        return " ".join(query.split())
+        
+    def _embed_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Return a (len(queries), dim) float32 matrix of query embeddings.
+        
+        Cached queries are served from the LRU cache; all misses are encoded
+        together in a single forward pass.
+        """
+        keys = [self._normalize_query(query) for query in queries]
+        embeddings = [self.query_cache.get(key) for key in keys]
+        
+        # Deduplicate misses so a batch with repeats encodes each query once
+        missing = list(dict.fromkeys(key for key, emb in zip(keys, embeddings) if emb is None))
+        if missing:
+            # Encode queries using lazy loaded model
+            model = self._get_model()
+            encoded = np.asarray(model.encode(missing, device=self.device), dtype='float32')
+            fresh = dict(zip(missing, encoded))
+            for key, embedding in fresh.items():
+                self.query_cache.put(key, embedding)
+            embeddings = [fresh[key] if emb is None else emb for key, emb in zip(keys, embeddings)]
+        
+        return np.vstack(embeddings)
+        
+    def index_info(self):
+        """Return the active index type and size."""
+        return {
+            "configured_type": self.index_factory.index_type,
+            "precision": self.index_factory.precision,
+            "index_class": IndexFactory.describe(self.index),
+            "vectors": self.index.ntotal if self.index is not None else 0
+        }
+        
+    def cache_stats(self):
+        """Return query-embedding cache hit/miss/eviction counters."""
+        return self.query_cache.stats()
         
     def similarity_search(self, query: str, k: int = 3) -> List[str]:
         """Search for similar documents."""
+        return self.similarity_search_batch([query], k)[0]
+        
+    def similarity_search_batch(self, queries: List[str], k: int = 3) -> List[List[str]]:
+        """
+        Search for similar documents for several queries at once.
+        
+        All queries are embedded in one forward pass and looked up with a
+        single index.search on the stacked matrix.
+        
+        Returns:
+            One list of matching documents per query, in input order
+        """
+        if self.index is None:
+            return [[] for _ in queries]
+        if not queries:
+            return []
+            
+        query_embeddings = self._embed_queries(queries)
+        return [[self.documents[row] for row in rows] for rows in self._search_rows(query_embeddings, k)]
+        
+    def similarity_search_with_citations(self, query: str, k: int = 3) -> List[Dict[str, Any]]:
+        """Search for similar chunks, each with its source, title, position and character span."""
+        return self.similarity_search_with_citations_batch([query], k)[0]
+        
+    def similarity_search_with_citations_batch(self, queries: List[str], k: int = 3) -> List[List[Dict[str, Any]]]:
+        """
+        Batched similarity_search_with_citations.
+        
+        Returns:
+            One list of citation dicts (text, source, title, position, start,
+            end) per query, in input order
+        """
         if self.index is None:
+            return [[] for _ in queries]
+        if not queries:
             return []
             
-        # Encode query using lazy loaded model
-        model = self._get_model()
-        query_embedding = model.encode([query], device='cpu')
-        D, I = self.index.search(np.array(query_embedding).astype('float32'), k)
+        query_embeddings = self._embed_queries(queries)
+        return [[self.segments.citation(row) for row in rows] for rows in self._search_rows(query_embeddings, k)]
         
-        # Return matching documents
-        return [self.documents[i] for i in I[0] if i < len(self.documents)]
+    def _search_rows(self, query_embeddings: np.ndarray, k: int) -> List[List[int]]:
+        """Row numbers of the k nearest live chunks for each query embedding."""
+        rescore = self.rerank_factor > 0 and self.index_factory.is_lossy()
+        fetch = k * self.rerank_factor if rescore else k
+        D, I = self.index.search(query_embeddings, fetch, params=self._search_params())
+        
+        results = []
+        for query, row_ids in zip(query_embeddings, I):
+            # FAISS returns chunk ids (padded with -1); deleted or unknown ids map to row -1
+            rows = [row for row in self.segments.rows_for_ids(row_ids) if row >= 0]
+            if rescore and rows:
+                # Compressed distances only shortlist; rank by the exact float32 vectors
+                vectors = self.segments.vectors_for_rows(rows)
+                distances = ((vectors - query) ** 2).sum(axis=1)
+                rows = [rows[i] for i in np.argsort(distances, kind="stable")[:k]]
+            results.append(rows)
+        return results
+        
+    def _search_params(self):
+        """Search parameters excluding deleted ids still present in the index, if any."""
+        if not self._dead_in_index:
+            return None
+        index, count, params = self._exclusion
+        if index is not self.index or count != len(self._dead_in_index):
+            dead = np.array(sorted(self._dead_in_index), dtype=np.int64)
+            params = self.index_factory.search_params(self.index, exclude_ids=dead)
+            self._exclusion = (self.index, len(self._dead_in_index), params)
+        return params
     
     def save_index(self, path: str = None):
-        """Save the FAISS index and documents."""
+        """
+        Save the FAISS index and documents.
+        
+        Only chunks added since the last save are written, as a new immutable
+        segment. Compacting small segments and refreshing the index snapshot
+        happen on a background merge when needed.
+        """
         path = path or self.index_path
         if path and self.index is not None:
             os.makedirs(os.path.dirname(path), exist_ok=True)
-            faiss.write_index(self.index, f"{path}.index")
-            with open(f"{path}.docs", "w", encoding="utf-8") as f:
-                f.write("\n".join(self.documents))
+            self.segments.flush(path)
+            if self.segments.needs_compaction():
+                self.compact()
+            elif self._snapshot_stale or self.segments.needs_merge():
+                self.merge_segments()
+    
+    def merge_segments(self, wait: bool = False):
+        """
+        Compact small segments and write a fresh index snapshot.
+        
+        Args:
+            wait: Block until the merge finishes instead of running it in the background
+        """
+        index = None
+        snapshot_rows = None
+        segments = self.segments
+        needs_snapshot = self._snapshot_stale or segments.snapshot_rows < segments.stored_count
+        if needs_snapshot and segments.pending_count == 0 and self.index is not None:
+            if self._dead_in_index - segments.tombstones:
+                # The index holds ids a compaction already dropped; don't persist them
+                self._rebuild_index()
+            # Snapshot a private copy so ingestion can keep mutating self.index
+            self._ensure_writable_index()
+            index = faiss.clone_index(self.index)
+            # The copy covers the rows stored now; a flush during the merge must not count
+            snapshot_rows = segments.stored_count
+            self._snapshot_stale = False
+        segments.start_merge(index, background=not wait, snapshot_rows=snapshot_rows)
+        if wait:
+            segments.wait_for_merge()
+    
+    def compact(self, wait: bool = False):
+        """
+        Rewrite the saved segments without deleted chunks and rebuild the index snapshot.
+        
+        Args:
+            wait: Block until done and also rebuild the in-memory index
+        """
+        segments = self.segments
+        if segments.path is None:
+            return
+        segments.wait_for_merge()
+        segments.start_merge(compact=True, build_index=self.index_factory.build, background=not wait)
+        if wait:
+            segments.wait_for_merge()
+            if self._dead_in_index:
+                self._rebuild_index()
+                self._snapshot_stale = False
+    
+    def _rebuild_index(self):
+        """Rebuild self.index from the live rows' stored vectors."""
+        ids = self.segments.get_ids(0, len(self.segments))
+        live = np.array([id_ not in self.segments.tombstones for id_ in ids.tolist()], dtype=bool)
+        if not live.any():
+            self.index = None
+        else:
+            vectors = self.segments.get_vectors(0, len(self.segments))
+            self.index = self.index_factory.build(vectors[live], ids[live])
+        self._mmap_index_file = None
+        self._dead_in_index = set()
+        self._snapshot_stale = True
     
     def load_index(self, path: str = None):
-        """Load the FAISS index and documents."""
+        """
+        Load the FAISS index and documents.
+        
+        The index snapshot is memory-mapped when Config.MMAP_INDEX is set and
+        segment files are always memory-mapped, so opening is cheap and pages
+        are shared between worker processes. Rows saved after the snapshot
+        are added from their segments' stored vectors. Indexes saved in the
+        older single-file layouts are still readable and are converted to
+        segments on the next save.
+        """
         path = path or self.index_path
-        if path and os.path.exists(f"{path}.index"):
-            self.index = faiss.read_index(f"{path}.index")
-            if os.path.exists(f"{path}.docs"):
-                with open(f"{path}.docs", "r", encoding="utf-8") as f:
-                    self.documents = [line.strip() for line in f if line.strip()]
+        if not path:
+            return
+        if SegmentStore.exists(path):
+            self.segments = SegmentStore()
+            self.segments.load(path)
+            self._load_snapshot(self.segments.snapshot_file())
+            
+            if self.index is not None and not IndexFactory.has_stable_ids(self.index):
+                # Version 1 snapshots were positional; rebuild with ids from the segments
+                self._rebuild_index()
+            else:
+                # The snapshot may still hold chunks deleted after it was written
+                self._dead_in_index = set(self.segments.tombstones)
+                
+                # Rows appended after the last snapshot come from their segments
+                tail_start = self.segments.snapshot_rows
+                if tail_start < len(self.segments):
+                    ids = self.segments.get_ids(tail_start, len(self.segments))
+                    live = np.array([id_ not in self.segments.tombstones for id_ in ids.tolist()], dtype=bool)
+                    if live.any():
+                        vectors = self.segments.get_vectors(tail_start, len(self.segments))[live]
+                        if self.index is None:
+                            self._create_index(vectors.shape[1])
+                        else:
+                            self._ensure_writable_index()
+                        self.index.add_with_ids(vectors, ids[live])
+            self._maybe_upgrade_index()
+        elif os.path.exists(f"{path}.index"):
+            self._load_single_file(path)
+    
+    def _load_snapshot(self, snapshot_file: Optional[str]):
+        """Read an index snapshot, memory-mapped if configured."""
+        self.index = None
+        self._mmap_index_file = None
+        self._snapshot_stale = False
+        self._dead_in_index = set()
+        if snapshot_file is None:
+            return
+        if config.MMAP_INDEX:
+            self.index = faiss.read_index(snapshot_file, faiss.IO_FLAG_MMAP)
+            self._mmap_index_file = snapshot_file
+        else:
+            self.index = faiss.read_index(snapshot_file)
+        self.index_factory.configure(self.index)
+    
+    def _load_single_file(self, path: str):
+        """Load the pre-segment <path>.index + .docs(.bin) layout."""
+        index = faiss.read_index(f"{path}.index")
+        if DocumentStore.exists(path):
+            documents = list(DocumentStore.load(path))
+        elif os.path.exists(f"{path}.docs"):
+            with open(f"{path}.docs", "r", encoding="utf-8") as f:
+                documents = [line.strip() for line in f if line.strip()]
+        else:
+            documents = []
+        
+        # Segments keep raw vectors, so recover them from the index once
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            ivf.make_direct_map()
+        vectors = index.reconstruct_n(0, index.ntotal)
+        
+        count = min(len(documents), len(vectors))
+        if count != index.ntotal:
+            # The newline-joined format misaligns chunks containing newlines
+            print(f"Warning: legacy index has {index.ntotal} vectors but {len(documents)} documents; keeping {count}")
+        
+        self.segments = SegmentStore()
+        ids = self.segments.append([Chunk.from_text(text) for text in documents[:count]], vectors[:count])
+        # Legacy indexes are positional; rebuild them keyed by the new chunk ids
+        self.index = self.index_factory.build(vectors[:count], ids) if count else None
+        self._mmap_index_file = None
+        self._snapshot_stale = True
+        if self.index is not None:
+            self.index_factory.configure(self.index)
+        print(f"Loaded legacy index at {path}; it will be converted to segments on the next save")
+        self._maybe_upgrade_index()
@@ -0,0 +1,219 @@
+import numpy as np
+import faiss
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from config.config import config
+
+INDEX_TYPES = ("flat", "ivf_flat", "hnsw", "ivf_pq")
+# Storage precision -> FAISS scalar quantizer type (None keeps raw float32)
+PRECISIONS = {
+    "float32": None,
+    "float16": faiss.ScalarQuantizer.QT_fp16,
+    "int8": faiss.ScalarQuantizer.QT_8bit,
+}
+
+class IndexFactory:
+    """
+    Builds and tunes the FAISS index used by FAISSStore.
+
+    Supported index types:
+        flat     - exact brute-force search (IndexFlatL2)
+        ivf_flat - inverted lists over a coarse quantizer (IndexIVFFlat)
+        hnsw     - graph-based search (IndexHNSWFlat), no training needed
+        ivf_pq   - inverted lists with product-quantized codes (IndexIVFPQ)
+
+    Flat, HNSW and IVF-Flat vectors can be stored at reduced precision
+    (float16 halves memory, int8 quarters it) with scalar quantizers.
+
+    IVF variants need training data, so stores start on a Flat index and are
+    switched over by upgrade() once enough vectors have been buffered.
+
+    Vectors carry stable chunk ids that survive deletes and rebuilds: IVF
+    indexes store ids natively, Flat and HNSW are wrapped in IndexIDMap2.
+    """
+
+    def __init__(self, index_type: str = None, nlist: int = None, nprobe: int = None,
+                 hnsw_m: int = None, ef_construction: int = None, ef_search: int = None,
+                 pq_m: int = None, pq_nbits: int = None, train_size: int = None,
+                 precision: str = None):
+        self.index_type = (index_type or config.INDEX_TYPE).lower()
+        if self.index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type '{self.index_type}', expected one of {INDEX_TYPES}")
+        self.precision = (precision or config.VECTOR_PRECISION).lower()
+        if self.precision not in PRECISIONS:
+            raise ValueError(f"Unknown vector precision '{self.precision}', expected one of {tuple(PRECISIONS)}")
+        if self.index_type == "ivf_pq" and self.precision != "float32":
+            raise ValueError("ivf_pq already compresses vectors; use VECTOR_PRECISION 'float32' with it")
+        self.nlist = nlist or config.IVF_NLIST
+        self.nprobe = nprobe or config.IVF_NPROBE
+        self.hnsw_m = hnsw_m or config.HNSW_M
+        self.ef_construction = ef_construction or config.HNSW_EF_CONSTRUCTION
+        self.ef_search = ef_search or config.HNSW_EF_SEARCH
+        self.pq_m = pq_m or config.PQ_M
+        self.pq_nbits = pq_nbits or config.PQ_NBITS
+        self.train_size = train_size or config.IVF_TRAIN_SIZE
+
+    @property
+    def quantizer_type(self):
+        """FAISS scalar quantizer type for the configured precision, or None for float32."""
+        return PRECISIONS[self.precision]
+
+    def is_ivf(self) -> bool:
+        return self.index_type in ("ivf_flat", "ivf_pq")
+
+    def is_lossy(self) -> bool:
+        """Whether the trained index stores compressed vectors, so distances are approximate."""
+        return self.index_type == "ivf_pq" or self.precision != "float32"
+
+    def requires_training(self) -> bool:
+        """Whether the target index type has to be trained before use."""
+        # int8 learns per-dimension value ranges; float16 is a fixed conversion
+        return self.is_ivf() or self.precision == "int8"
+
+    def training_threshold(self) -> int:
+        """Number of buffered vectors needed before switching to a trained index."""
+        if not self.is_ivf():
+            return config.SQ_TRAIN_SIZE
+        if self.train_size:
+            return self.train_size
+        # FAISS wants roughly 39 training points per centroid
+        centroids = self.nlist
+        if self.index_type == "ivf_pq":
+            centroids = max(centroids, 2 ** self.pq_nbits)
+        return 39 * centroids
+
+    def create(self, dimension: int) -> faiss.Index:
+        """Create an empty (untrained) index of the configured type and precision."""
+        qtype = self.quantizer_type
+        if self.index_type == "flat":
+            if qtype is None:
+                index = faiss.IndexFlatL2(dimension)
+            else:
+                index = faiss.IndexScalarQuantizer(dimension, qtype, faiss.METRIC_L2)
+        elif self.index_type == "hnsw":
+            if qtype is None:
+                index = faiss.IndexHNSWFlat(dimension, self.hnsw_m)
+            else:
+                index = faiss.IndexHNSWSQ(dimension, qtype, self.hnsw_m)
+            index.hnsw.efConstruction = self.ef_construction
+        elif self.index_type == "ivf_flat":
+            quantizer = faiss.IndexFlatL2(dimension)
+            if qtype is None:
+                index = faiss.IndexIVFFlat(quantizer, dimension, self.nlist, faiss.METRIC_L2)
+            else:
+                index = faiss.IndexIVFScalarQuantizer(quantizer, dimension, self.nlist, qtype, faiss.METRIC_L2)
+        else:
+            if dimension % self.pq_m != 0:
+                raise ValueError(f"PQ_M ({self.pq_m}) must divide the embedding dimension ({dimension})")
+            quantizer = faiss.IndexFlatL2(dimension)
+            index = faiss.IndexIVFPQ(quantizer, dimension, self.nlist, self.pq_m, self.pq_nbits)
+        self.configure(index)
+        return index
+
+    @staticmethod
+    def _unwrap(index: faiss.Index) -> faiss.Index:
+        """Return the index inside an IndexIDMap/IndexIDMap2 wrapper."""
+        index = faiss.downcast_index(index)
+        if isinstance(index, (faiss.IndexIDMap, faiss.IndexIDMap2)):
+            index = faiss.downcast_index(index.index)
+        return index
+
+    def create_initial(self, dimension: int) -> faiss.Index:
+        """Create the id-mapped index a new store starts with (Flat while training data is buffered)."""
+        if self.requires_training():
+            return faiss.IndexIDMap2(faiss.IndexFlatL2(dimension))
+        return faiss.IndexIDMap2(self.create(dimension))
+
+    def should_upgrade(self, index: faiss.Index) -> bool:
+        """Whether a buffering Flat index has collected enough vectors to train the target type."""
+        if index is None or not self.requires_training():
+            return False
+        return isinstance(self._unwrap(index), faiss.IndexFlat) and index.ntotal >= self.training_threshold()
+
+    def upgrade(self, index: faiss.Index) -> faiss.Index:
+        """Train the target index on the vectors held by a Flat index and move them over."""
+        index = faiss.downcast_index(index)
+        inner = self._unwrap(index)
+        vectors = inner.reconstruct_n(0, inner.ntotal)
+        if self.is_id_mapped(index):
+            ids = faiss.vector_to_array(index.id_map).astype(np.int64)
+        else:
+            ids = np.arange(index.ntotal, dtype=np.int64)
+        print(f"Training {self.index_type} index on {len(vectors)} buffered vectors...")
+        new_index = self._train(vectors)
+        new_index.add_with_ids(vectors, ids)
+        print(f"Switched from flat to {self.index_type} ({self.precision}) index ({new_index.ntotal} vectors)")
+        return new_index
+
+    def _train(self, vectors: np.ndarray) -> faiss.Index:
+        """Create an empty index of the target type trained on vectors."""
+        new_index = self.create(vectors.shape[1])
+        # Training cost grows with sample size; 256 points per centroid is plenty
+        sample_size = min(len(vectors), 256 * self.nlist if self.is_ivf() else config.SQ_TRAIN_SIZE)
+        if sample_size < len(vectors):
+            rng = np.random.default_rng(0)
+            sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+        else:
+            sample = vectors
+        new_index.train(sample)
+        if self.is_ivf():
+            # IVF takes add_with_ids/remove_ids directly; IndexIDMap2 would break remove_ids
+            return new_index
+        return faiss.IndexIDMap2(new_index)
+
+    def build(self, vectors: np.ndarray, ids: np.ndarray) -> faiss.Index:
+        """Build a complete index over vectors keyed by ids, trained if the type needs it."""
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        ids = np.asarray(ids, dtype=np.int64)
+        if self.requires_training() and len(vectors) >= self.training_threshold():
+            index = self._train(vectors)
+        else:
+            index = self.create_initial(vectors.shape[1])
+        index.add_with_ids(vectors, ids)
+        return index
+
+    def configure(self, index: faiss.Index):
+        """Apply the search-time parameters (nprobe / efSearch) to an index."""
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            ivf.nprobe = min(self.nprobe, ivf.nlist)
+            return
+        index = self._unwrap(index)
+        if isinstance(index, faiss.IndexHNSW):
+            index.hnsw.efSearch = self.ef_search
+
+    @classmethod
+    def search_params(cls, index: faiss.Index, exclude_ids: np.ndarray) -> faiss.SearchParameters:
+        """Search parameters that skip exclude_ids, keeping the index's own nprobe / efSearch."""
+        selector = faiss.IDSelectorNot(faiss.IDSelectorBatch(exclude_ids))
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            # IVF indexes reject plain SearchParameters, and the IVF defaults would reset nprobe
+            params = faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+        else:
+            inner = cls._unwrap(index)
+            if isinstance(inner, faiss.IndexHNSW):
+                params = faiss.SearchParametersHNSW(sel=selector, efSearch=inner.hnsw.efSearch)
+            else:
+                params = faiss.SearchParameters(sel=selector)
+        # The parameters only hold a raw pointer to the selector
+        params.referenced_selector = selector
+        return params
+
+    @classmethod
+    def describe(cls, index: faiss.Index) -> str:
+        """Short name of the concrete index class, e.g. 'IndexHNSWFlat'."""
+        if index is None:
+            return "none"
+        return type(cls._unwrap(index)).__name__
+
+    @classmethod
+    def is_id_mapped(cls, index: faiss.Index) -> bool:
+        """Whether index is wrapped in IndexIDMap/IndexIDMap2."""
+        return isinstance(faiss.downcast_index(index), (faiss.IndexIDMap, faiss.IndexIDMap2))
+
+    @classmethod
+    def has_stable_ids(cls, index: faiss.Index) -> bool:
+        """Whether search results are chunk ids rather than insertion positions."""
+        return cls.is_id_mapped(index) or faiss.try_extract_index_ivf(index) is not None
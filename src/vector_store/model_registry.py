@@ -0,0 +1,76 @@
+import threading
+import time
+from typing import Dict, Tuple, Any
+from sentence_transformers import SentenceTransformer
+
+class ModelRegistry:
+    """
+    Process-wide registry of SentenceTransformer models.
+
+    Every FAISSStore (and therefore every ingestor and chatbot, across all
+    Streamlit sessions) asks the registry for its model instead of loading
+    its own copy, so each (model name, device) pair is resident exactly once.
+    """
+
+    def __init__(self):
+        self._models: Dict[Tuple[str, str], SentenceTransformer] = {}
+        self._load_times: Dict[Tuple[str, str], float] = {}
+        self._locks: Dict[Tuple[str, str], threading.Lock] = {}
+        self._registry_lock = threading.Lock()
+
+    def _get_lock(self, key: Tuple[str, str]) -> threading.Lock:
+        """Return the per-key load lock so different models can load in parallel."""
+        with self._registry_lock:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def get_model(self, model_name: str, device: str = 'cpu') -> SentenceTransformer:
+        """Return the shared model for (model_name, device), loading it on first use."""
+        key = (model_name, device)
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._get_lock(key):
+            # Another thread may have finished loading while we waited
+            model = self._models.get(key)
+            if model is not None:
+                return model
+
+            try:
+                print(f"Loading SentenceTransformer model: {model_name} ({device})...")
+                start = time.perf_counter()
+                # Force an explicit device to avoid meta tensor issues
+                model = SentenceTransformer(model_name, device=device)
+                model.eval()
+
+                self._load_times[key] = time.perf_counter() - start
+                self._models[key] = model
+                print(f"Model loaded successfully in {self._load_times[key]:.2f}s: {model_name}")
+            except Exception as e:
+                print(f"Error loading model: {e}")
+                import traceback
+                traceback.print_exc()
+                raise
+        return model
+
+    def is_loaded(self, model_name: str, device: str = 'cpu') -> bool:
+        """Check whether a model is already resident."""
+        return (model_name, device) in self._models
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the resident models and how long each took to load."""
+        return {
+            "resident_models": len(self._models),
+            "load_seconds": {f"{name}@{device}": seconds for (name, device), seconds in self._load_times.items()}
+        }
+
+    def clear(self):
+        """Drop all resident models (mainly for benchmarks)."""
+        with self._registry_lock:
+            self._models.clear()
+            self._load_times.clear()
+            self._locks.clear()
+
+model_registry = ModelRegistry()
@@ -0,0 +1,735 @@
+import os
+import json
+import uuid
+import threading
+import numpy as np
+import faiss
+from typing import Callable, Iterable, List, Optional, Dict, Any, Set
+from .doc_store import DocumentStore
+from .chunks import Chunk, SourceText
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from config.config import config
+
+MANIFEST_VERSION = 2
+
+class Segment:
+    """
+    One immutable on-disk segment: chunks, their raw float32 vectors, their
+    stable int64 ids and the source each chunk came from.
+
+    Chunks are spans over the segment's source texts: every document's
+    cleaned text is stored once and each row records which text it points
+    into and where, so overlapping chunks share storage. Segments written
+    before spans existed store one text per row instead.
+    """
+
+    # Columns of the .spans.npy array
+    TEXT, BYTE_START, BYTE_END, START, END, POSITION = range(6)
+
+    def __init__(self, directory: str, name: str, first_row: int = 0):
+        self.name = name
+        prefix = os.path.join(directory, name)
+        self.documents = DocumentStore.load(prefix)
+        self.vectors = np.load(f"{prefix}.vectors.npy", mmap_mode="r")
+        self.spans = np.load(f"{prefix}.spans.npy", mmap_mode="r") if os.path.exists(f"{prefix}.spans.npy") else None
+        rows = len(self.spans) if self.spans is not None else len(self.documents)
+
+        if os.path.exists(f"{prefix}.ids.npy"):
+            self.ids = np.load(f"{prefix}.ids.npy", mmap_mode="r")
+        else:
+            # Version 1 segments had no ids; their ids were their row numbers
+            self.ids = np.arange(first_row, first_row + rows, dtype=np.int64)
+
+        self.titles = []
+        if os.path.exists(f"{prefix}.meta.json"):
+            with open(f"{prefix}.meta.json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            self.sources = meta["sources"]
+            self.titles = meta.get("titles", [])
+            self.source_index = np.load(f"{prefix}.source_idx.npy", mmap_mode="r")
+        else:
+            self.sources = [None]
+            self.source_index = np.zeros(rows, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def source(self, row: int) -> Optional[str]:
+        return self.sources[self.source_index[row]]
+
+    def text(self, row: int) -> str:
+        """Text of the chunk at row; only its own bytes are read from the mapping."""
+        if self.spans is None:
+            return self.documents[row]
+        span = self.spans[row]
+        data = self.documents.get_bytes(int(span[self.TEXT]))
+        return str(data[int(span[self.BYTE_START]):int(span[self.BYTE_END])], "utf-8")
+
+    def citation(self, row: int) -> Dict[str, Any]:
+        """Text and provenance of the chunk at row (see Chunk.citation)."""
+        text = self.text(row)
+        if self.spans is None:
+            return {"text": text, "source": self.source(row), "title": None, "position": None,
+                    "start": 0, "end": len(text)}
+        span = self.spans[row]
+        position = int(span[self.POSITION])
+        return {
+            "text": text,
+            "source": self.source(row),
+            "title": self.titles[int(span[self.TEXT])],
+            "position": position if position >= 0 else None,
+            "start": int(span[self.START]),
+            "end": int(span[self.END]),
+        }
+
+    def chunk(self, row: int, documents: Dict[Any, SourceText]) -> Chunk:
+        """
+        The chunk at row as a Chunk, for rewriting it into another segment.
+
+        Args:
+            documents: Source texts already read, shared across calls so chunks
+                of the same text keep sharing one copy
+        """
+        if self.spans is None:
+            return Chunk.from_text(self.documents[row], self.source(row))
+        span = self.spans[row]
+        key = (self.name, int(span[self.TEXT]))
+        if key not in documents:
+            text = self.documents[key[1]]
+            # A save in the middle of a page leaves its chunks in two segments; keep one copy
+            documents[key] = documents.setdefault((self.source(row), text),
+                                                  SourceText(text, self.source(row), self.titles[key[1]]))
+        position = int(span[self.POSITION])
+        return Chunk(documents[key], int(span[self.START]), int(span[self.END]), position if position >= 0 else None)
+
+    @staticmethod
+    def files(directory: str, name: str) -> List[str]:
+        prefix = os.path.join(directory, name)
+        return [
+            DocumentStore.blob_path(prefix), DocumentStore.offsets_path(prefix), f"{prefix}.spans.npy",
+            f"{prefix}.vectors.npy", f"{prefix}.ids.npy", f"{prefix}.meta.json", f"{prefix}.source_idx.npy"
+        ]
+
+    @classmethod
+    def write(cls, directory: str, name: str, chunks: List[Chunk], vectors: np.ndarray,
+              ids: np.ndarray) -> "Segment":
+        """Write a new segment; it only becomes visible once a manifest references it."""
+        prefix = os.path.join(directory, name)
+
+        # Each distinct source text is written once, however many chunks point into it
+        texts: Dict[int, int] = {}
+        documents: List[SourceText] = []
+        by_document: List[List[Chunk]] = []
+        for chunk in chunks:
+            if id(chunk.document) not in texts:
+                texts[id(chunk.document)] = len(documents)
+                documents.append(chunk.document)
+                by_document.append([])
+            by_document[texts[id(chunk.document)]].append(chunk)
+        byte_offsets = [_byte_offsets(document.text, document_chunks)
+                        for document, document_chunks in zip(documents, by_document)]
+
+        spans = np.empty((len(chunks), 6), dtype=np.int64)
+        for row, chunk in enumerate(chunks):
+            text = texts[id(chunk.document)]
+            offsets = byte_offsets[text]
+            spans[row] = (text, offsets[chunk.start], offsets[chunk.end], chunk.start, chunk.end,
+                          -1 if chunk.position is None else chunk.position)
+
+        DocumentStore.from_texts(document.text for document in documents).save(prefix)
+        np.save(f"{prefix}.spans.npy", spans)
+        np.save(f"{prefix}.vectors.npy", np.ascontiguousarray(vectors, dtype=np.float32))
+        np.save(f"{prefix}.ids.npy", np.asarray(ids, dtype=np.int64))
+
+        # Many chunks share a page, so store each source once plus a per-row index
+        sources = [chunk.source for chunk in chunks]
+        unique = list(dict.fromkeys(sources))
+        lookup = {source: i for i, source in enumerate(unique)}
+        np.save(f"{prefix}.source_idx.npy", np.array([lookup[s] for s in sources], dtype=np.int32))
+        with open(f"{prefix}.meta.json", "w", encoding="utf-8") as f:
+            json.dump({"sources": unique, "titles": [document.title for document in documents]}, f)
+        return cls(directory, name)
+
+def _byte_offsets(text: str, chunks: List[Chunk]) -> Dict[int, int]:
+    """UTF-8 byte offset of every chunk boundary in text, in one pass over the sorted boundaries."""
+    boundaries = sorted({offset for chunk in chunks for offset in (chunk.start, chunk.end)})
+    offsets = {}
+    previous = 0
+    position = 0
+    for boundary in boundaries:
+        position += len(text[previous:boundary].encode("utf-8"))
+        offsets[boundary] = position
+        previous = boundary
+    return offsets
+
+class SegmentStore:
+    """
+    Append-only, segmented persistence for documents and their vectors.
+
+    On disk, under <path>.segments/:
+        manifest.json           - ordered segment list, id counter, tombstones and index snapshot
+        seg-NNNNNN.*            - immutable segments (documents, vectors, ids, sources)
+        tomb-NNNNNN.npy         - ids of deleted chunks not yet compacted away
+        index-NNNNNN.faiss      - FAISS index snapshot covering the first `rows` rows
+
+    Every chunk gets a stable int64 id from a monotonically increasing
+    counter. Ids stay sorted in row order, so id -> row lookups are binary
+    searches over memory-mapped arrays.
+
+    flush() writes only the rows added since the last flush as a new segment
+    and swaps in a new manifest. start_merge() runs in the background: it
+    compacts runs of small adjacent segments and writes a fresh index
+    snapshot, so loading is "mmap the snapshot, add the few rows after it".
+    Deleting marks ids as tombstones; a compacting merge rewrites the
+    segments without them and rebuilds the index.
+    """
+
+    def __init__(self):
+        self.path: Optional[str] = None
+        self.segments: List[Segment] = []
+        # (segments, row offset of each segment plus the total, first id of each segment),
+        # swapped as one unit so lock-free readers never see a half-updated layout
+        self._view = ([], np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64))
+        self._pending_chunks: List[Chunk] = []
+        self._pending_vectors: List[np.ndarray] = []
+        self._pending_ids: List[int] = []
+        self.tombstones: Set[int] = set()
+        self._tombstones_dirty = False
+        # source -> ids of its live chunks; ids survive merges, so only appends and deletions change it
+        self._source_ids: Dict[Optional[str], Set[int]] = {}
+        self.manifest = self._new_manifest()
+        self._lock = threading.RLock()
+        self._merge_thread: Optional[threading.Thread] = None
+
+    # ---- layout -------------------------------------------------------------
+
+    @staticmethod
+    def directory(path: str) -> str:
+        return f"{path}.segments"
+
+    @classmethod
+    def manifest_path(cls, path: str) -> str:
+        return os.path.join(cls.directory(path), "manifest.json")
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        """Whether a segmented store has been saved at path."""
+        return os.path.exists(cls.manifest_path(path))
+
+    @staticmethod
+    def _new_manifest(next_segment: int = 1, next_id: int = 0) -> Dict[str, Any]:
+        return {
+            "version": MANIFEST_VERSION,
+            "generation": uuid.uuid4().hex,
+            "next_segment": next_segment,
+            "next_id": next_id,
+            "segments": [],
+            "tombstones": None,
+            "index": None
+        }
+
+    @classmethod
+    def _read_manifest(cls, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(cls.manifest_path(path), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_manifest(self):
+        manifest_file = self.manifest_path(self.path)
+        with open(f"{manifest_file}.tmp", "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(f"{manifest_file}.tmp", manifest_file)
+
+    def _reserve_name(self, prefix: str) -> str:
+        number = self.manifest["next_segment"]
+        self.manifest["next_segment"] = number + 1
+        return f"{prefix}-{number:06d}"
+
+    def _owns(self, path: str) -> bool:
+        """Whether the manifest at path is the one this store last wrote or loaded."""
+        if self.path != path:
+            return False
+        on_disk = self._read_manifest(path)
+        return on_disk is not None and on_disk.get("generation") == self.manifest["generation"]
+
+    def _reindex(self):
+        starts = np.zeros(len(self.segments) + 1, dtype=np.int64)
+        starts[1:] = np.cumsum([len(s) for s in self.segments])
+        first_ids = np.array([s.ids[0] for s in self.segments], dtype=np.int64)
+        self._view = (list(self.segments), starts, first_ids)
+
+    # ---- rows ---------------------------------------------------------------
+
+    @property
+    def stored_count(self) -> int:
+        return int(self._view[1][-1])
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending_chunks)
+
+    @property
+    def live_count(self) -> int:
+        """Number of chunks that have not been deleted."""
+        return len(self) - len(self.tombstones)
+
+    def __len__(self) -> int:
+        return self.stored_count + self.pending_count
+
+    def _locate(self, row: int):
+        """Return (segment, local row), or (None, pending position) for unsaved rows."""
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError("document index out of range")
+        segments, starts, _ = self._view
+        if row >= starts[-1]:
+            return None, row - int(starts[-1])
+        segment = int(np.searchsorted(starts, row, side="right")) - 1
+        return segments[segment], row - int(starts[segment])
+
+    def __getitem__(self, row: int) -> str:
+        segment, local = self._locate(row)
+        if segment is None:
+            return self._pending_chunks[local].text
+        return segment.text(local)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def source(self, row: int) -> Optional[str]:
+        """Source (e.g. page URL) the chunk at row came from."""
+        segment, local = self._locate(row)
+        if segment is None:
+            return self._pending_chunks[local].source
+        return segment.source(local)
+
+    def citation(self, row: int) -> Dict[str, Any]:
+        """Text and provenance (source, title, position, character span) of the chunk at row."""
+        segment, local = self._locate(row)
+        if segment is None:
+            return self._pending_chunks[local].citation()
+        return segment.citation(local)
+
+    def chunk(self, row: int, documents: Dict[Any, SourceText]) -> Chunk:
+        """The chunk at row as a Chunk; documents shares source texts across calls (see Segment.chunk)."""
+        segment, local = self._locate(row)
+        if segment is None:
+            return self._pending_chunks[local]
+        return segment.chunk(local, documents)
+
+    def _gather(self, start: int, end: int, attribute: str, pending: np.ndarray) -> List[np.ndarray]:
+        parts = []
+        segments, starts, _ = self._view
+        for i, segment in enumerate(segments):
+            seg_start, seg_end = int(starts[i]), int(starts[i + 1])
+            if seg_end > start and seg_start < end:
+                parts.append(getattr(segment, attribute)[max(start, seg_start) - seg_start:min(end, seg_end) - seg_start])
+        stored = int(starts[-1])
+        if end > stored and len(pending):
+            parts.append(pending[max(start - stored, 0):end - stored])
+        return parts
+
+    def get_vectors(self, start: int, end: int) -> np.ndarray:
+        """Raw float32 vectors for rows [start, end), read from segments and pending rows."""
+        pending = np.vstack(self._pending_vectors) if self._pending_vectors else np.zeros((0, 0), dtype=np.float32)
+        parts = self._gather(start, end, "vectors", pending)
+        if not parts:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.ascontiguousarray(np.vstack(parts), dtype=np.float32)
+
+    def vectors_for_rows(self, rows: List[int]) -> np.ndarray:
+        """Raw float32 vectors for arbitrary rows; only those rows' pages are read from disk."""
+        pending_starts = None
+        vectors = []
+        for row in rows:
+            segment, local = self._locate(row)
+            if segment is None:
+                # Pending vectors are kept as one array per append; index into them without stacking
+                if pending_starts is None:
+                    pending_starts = np.cumsum([0] + [len(v) for v in self._pending_vectors])
+                batch = int(np.searchsorted(pending_starts, local, side="right")) - 1
+                vectors.append(self._pending_vectors[batch][local - pending_starts[batch]])
+            else:
+                vectors.append(segment.vectors[local])
+        return np.array(vectors, dtype=np.float32)
+
+    def get_ids(self, start: int, end: int) -> np.ndarray:
+        """Ids of rows [start, end)."""
+        parts = self._gather(start, end, "ids", np.asarray(self._pending_ids, dtype=np.int64))
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(parts).astype(np.int64)
+
+    def rows_for_ids(self, ids: Iterable[int]) -> List[int]:
+        """Map ids to row numbers; deleted or unknown ids map to -1."""
+        segments, starts, first_ids = self._view
+        pending_ids = np.asarray(self._pending_ids, dtype=np.int64)
+        pending_first = int(pending_ids[0]) if len(pending_ids) else None
+        rows = []
+        for id_ in ids:
+            id_ = int(id_)
+            row = -1
+            if id_ >= 0 and id_ not in self.tombstones:
+                if pending_first is not None and id_ >= pending_first:
+                    local = int(np.searchsorted(pending_ids, id_))
+                    if local < len(pending_ids) and pending_ids[local] == id_:
+                        row = int(starts[-1]) + local
+                else:
+                    segment = int(np.searchsorted(first_ids, id_, side="right")) - 1
+                    if segment >= 0:
+                        seg_ids = segments[segment].ids
+                        local = int(np.searchsorted(seg_ids, id_))
+                        if local < len(seg_ids) and seg_ids[local] == id_:
+                            row = int(starts[segment]) + local
+            rows.append(row)
+        return rows
+
+    def append(self, chunks: List[Chunk], vectors: np.ndarray) -> np.ndarray:
+        """
+        Add rows in memory; they are persisted by the next flush().
+
+        Returns:
+            The stable ids assigned to the new rows
+        """
+        with self._lock:
+            first_id = self.manifest["next_id"]
+            ids = np.arange(first_id, first_id + len(chunks), dtype=np.int64)
+            self.manifest["next_id"] = first_id + len(chunks)
+            self._pending_chunks.extend(chunks)
+            self._pending_vectors.append(np.asarray(vectors, dtype=np.float32))
+            self._pending_ids.extend(ids.tolist())
+            for id_, chunk in zip(ids.tolist(), chunks):
+                self._source_ids.setdefault(chunk.source, set()).add(id_)
+            return ids
+
+    # ---- deletion -----------------------------------------------------------
+
+    def ids_for_source(self, source: Optional[str]) -> np.ndarray:
+        """Ids of the live chunks that came from source, in row order."""
+        with self._lock:
+            return np.array(sorted(self._source_ids.get(source, ())), dtype=np.int64)
+
+    def sources(self) -> Set[Optional[str]]:
+        """Sources that still have live chunks."""
+        with self._lock:
+            return {source for source, ids in self._source_ids.items() if ids}
+
+    def _index_sources(self):
+        """Rebuild the source -> live ids map from the segments (on load)."""
+        self._source_ids = {}
+        for segment in self.segments:
+            source_index = np.asarray(segment.source_index)
+            order = np.argsort(source_index, kind="stable")
+            values, starts = np.unique(source_index[order], return_index=True)
+            groups = np.split(np.asarray(segment.ids)[order], starts[1:])
+            for value, group in zip(values.tolist(), groups):
+                self._source_ids.setdefault(segment.sources[value], set()).update(
+                    id_ for id_ in group.tolist() if id_ not in self.tombstones)
+
+    def delete_ids(self, ids: Iterable[int]) -> int:
+        """Mark ids as deleted. Returns how many live chunks were deleted."""
+        with self._lock:
+            ids = [int(id_) for id_ in ids]
+            live = []
+            for id_, row in zip(ids, self.rows_for_ids(ids)):
+                if row >= 0 and id_ not in self.tombstones:
+                    live.append(id_)
+                    self.tombstones.add(id_)
+                    self._source_ids.get(self.source(row), set()).discard(id_)
+            if live:
+                self._tombstones_dirty = True
+            return len(live)
+
+    def _write_tombstones(self, directory: str) -> List[str]:
+        """Persist the tombstone set; returns the file it replaces, if any."""
+        obsolete = []
+        if self.manifest["tombstones"]:
+            obsolete.append(os.path.join(directory, self.manifest["tombstones"]))
+        if self.tombstones:
+            name = f"{self._reserve_name('tomb')}.npy"
+            np.save(os.path.join(directory, name), np.array(sorted(self.tombstones), dtype=np.int64))
+            self.manifest["tombstones"] = name
+        else:
+            self.manifest["tombstones"] = None
+        self._tombstones_dirty = False
+        return obsolete
+
+    # ---- snapshot -----------------------------------------------------------
+
+    def snapshot_file(self) -> Optional[str]:
+        """Path of the FAISS index snapshot, if one has been written."""
+        if self.path is None or not self.manifest["index"]:
+            return None
+        return os.path.join(self.directory(self.path), self.manifest["index"]["file"])
+
+    @property
+    def snapshot_rows(self) -> int:
+        """Number of leading rows whose ids are contained in the index snapshot."""
+        return self.manifest["index"]["rows"] if self.manifest["index"] else 0
+
+    # ---- persistence --------------------------------------------------------
+
+    def load(self, path: str):
+        """Open the segments listed in the manifest at path (all files are memory-mapped)."""
+        with self._lock:
+            manifest = self._read_manifest(path)
+            if manifest is None:
+                raise FileNotFoundError(self.manifest_path(path))
+            directory = self.directory(path)
+            self.path = path
+            self.manifest = manifest
+            self.segments = []
+            row = 0
+            for entry in manifest["segments"]:
+                self.segments.append(Segment(directory, entry["name"], first_row=row))
+                row += len(self.segments[-1])
+            # Version 1 manifests numbered ids by row
+            manifest.setdefault("next_id", row)
+            manifest.setdefault("tombstones", None)
+            if manifest["tombstones"]:
+                self.tombstones = set(np.load(os.path.join(directory, manifest["tombstones"])).tolist())
+            else:
+                self.tombstones = set()
+            self._tombstones_dirty = False
+            self._pending_chunks = []
+            self._pending_vectors = []
+            self._pending_ids = []
+            self._reindex()
+            self._index_sources()
+
+    def flush(self, path: str) -> bool:
+        """
+        Persist rows added and deletions made since the last flush.
+
+        Only the new rows are written, as one new segment. If the manifest at
+        path was not written by this store (a fresh store, or another store
+        saved there since), all live rows are written as a new generation
+        replacing the old one.
+
+        Returns:
+            True if anything was written
+        """
+        with self._lock:
+            directory = self.directory(path)
+            os.makedirs(directory, exist_ok=True)
+            obsolete = []
+
+            if not self._owns(path):
+                # Start a new generation; keep counting names so no live file is overwritten
+                on_disk = self._read_manifest(path)
+                next_segment = max(self.manifest["next_segment"], on_disk["next_segment"] if on_disk else 1)
+                if on_disk:
+                    obsolete = self._manifest_files(directory, on_disk)
+                ids = self.get_ids(0, len(self))
+                live = np.array([id_ not in self.tombstones for id_ in ids.tolist()], dtype=bool)
+                rows = np.nonzero(live)[0]
+                documents = {}
+                chunks = [self.chunk(int(r), documents) for r in rows]
+                vectors = self.get_vectors(0, len(self))[live] if len(rows) else None
+                ids = ids[live]
+                self.path = path
+                self.manifest = self._new_manifest(next_segment, self.manifest["next_id"])
+                self.segments = []
+                self.tombstones = set()
+                self._tombstones_dirty = False
+            elif self.pending_count or self._tombstones_dirty:
+                chunks = self._pending_chunks
+                ids = np.asarray(self._pending_ids, dtype=np.int64)
+                vectors = np.vstack(self._pending_vectors) if chunks else None
+            else:
+                return False
+
+            if chunks:
+                name = self._reserve_name("seg")
+                self.segments.append(Segment.write(directory, name, chunks, vectors, ids))
+                self.manifest["segments"].append({"name": name, "rows": len(chunks)})
+            if self._tombstones_dirty:
+                obsolete.extend(self._write_tombstones(directory))
+            self._reindex()
+            self._pending_chunks = []
+            self._pending_vectors = []
+            self._pending_ids = []
+            self._write_manifest()
+            self._remove_files(obsolete)
+            return True
+
+    @staticmethod
+    def _manifest_files(directory: str, manifest: Dict[str, Any]) -> List[str]:
+        files = [f for entry in manifest["segments"] for f in Segment.files(directory, entry["name"])]
+        if manifest.get("index"):
+            files.append(os.path.join(directory, manifest["index"]["file"]))
+        if manifest.get("tombstones"):
+            files.append(os.path.join(directory, manifest["tombstones"]))
+        return files
+
+    @staticmethod
+    def _remove_files(files: List[str]):
+        # Readers that still map these files keep their pages until they close them
+        for file in files:
+            try:
+                os.remove(file)
+            except OSError:
+                pass
+
+    # ---- merging ------------------------------------------------------------
+
+    def _small_runs(self) -> List[List[int]]:
+        """Runs of at least two adjacent small segments, as lists of segment positions."""
+        runs, current = [], []
+        for i, segment in enumerate(self.segments):
+            if len(segment) < config.SEGMENT_SMALL_ROWS:
+                current.append(i)
+            else:
+                if len(current) > 1:
+                    runs.append(current)
+                current = []
+        if len(current) > 1:
+            runs.append(current)
+        return runs
+
+    def needs_merge(self) -> bool:
+        """Whether there are too many small segments or the index snapshot is stale."""
+        small = sum(len(run) for run in self._small_runs())
+        if small >= config.SEGMENT_MERGE_THRESHOLD:
+            return True
+        uncovered = self.stored_count - self.snapshot_rows
+        if uncovered <= 0:
+            return False
+        return self.manifest["index"] is None or uncovered > config.SNAPSHOT_STALE_FRACTION * self.stored_count
+
+    def needs_compaction(self) -> bool:
+        """Whether enough rows are tombstoned that rewriting the segments pays off."""
+        return bool(self.tombstones) and len(self.tombstones) > config.COMPACTION_DEAD_FRACTION * self.stored_count
+
+    def is_merging(self) -> bool:
+        return self._merge_thread is not None and self._merge_thread.is_alive()
+
+    def start_merge(self, index: Optional[faiss.Index] = None, compact: bool = False,
+                    build_index: Callable[[np.ndarray, np.ndarray], faiss.Index] = None,
+                    background: bool = True, snapshot_rows: Optional[int] = None):
+        """
+        Merge segments on a background thread (by default).
+
+        A plain merge compacts runs of small segments and, given an index
+        holding every stored row's id, writes it as the new snapshot. A
+        compacting merge rewrites all stored rows without tombstoned ones
+        and snapshots build_index(vectors, ids) over what remains.
+
+        Args:
+            index: Private copy of the index (e.g. faiss.clone_index); None skips the snapshot
+            compact: Drop tombstoned rows and rebuild the index snapshot
+            build_index: Builds an index from (vectors, ids); required when compacting
+            background: Run on a daemon thread instead of blocking
+            snapshot_rows: Stored rows the index covers, taken when it was copied
+                           (defaults to the rows stored now)
+        """
+        with self._lock:
+            if self.is_merging() or self.path is None:
+                return
+            if index is not None and self.pending_count:
+                raise ValueError("Flush pending rows before snapshotting the index")
+            if index is not None and snapshot_rows is None:
+                # Counted now, not when the merge runs: rows flushed meanwhile are not in the index
+                snapshot_rows = self.stored_count
+            if compact and build_index is None:
+                raise ValueError("Compaction needs a build_index callable")
+            if background:
+                self._merge_thread = threading.Thread(target=self._merge, args=(index, compact, build_index, snapshot_rows),
+                                                      daemon=True)
+                self._merge_thread.start()
+                return
+        self._merge(index, compact, build_index, snapshot_rows)
+
+    def wait_for_merge(self, timeout: Optional[float] = None):
+        if self._merge_thread is not None:
+            self._merge_thread.join(timeout)
+
+    def _merge(self, index: Optional[faiss.Index], compact: bool, build_index, snapshot_rows: Optional[int]):
+        try:
+            with self._lock:
+                path = self.path
+                directory = self.directory(path)
+                generation = self.manifest["generation"]
+                if compact:
+                    runs = [list(self.segments)] if self.segments else []
+                    dead = set(self.tombstones)
+                else:
+                    runs = [[self.segments[i] for i in run] for run in self._small_runs()]
+                    dead = set()
+                merged_names = [self._reserve_name("seg") for _ in runs]
+
+            # Heavy I/O happens without the lock; new files are invisible until the manifest swap
+            merged = []
+            for name, run in zip(merged_names, runs):
+                chunks, ids, vectors = [], [], []
+                documents = {}
+                for segment in run:
+                    keep = np.array([id_ not in dead for id_ in segment.ids.tolist()], dtype=bool)
+                    rows = np.nonzero(keep)[0]
+                    chunks.extend(segment.chunk(int(r), documents) for r in rows)
+                    ids.append(np.asarray(segment.ids)[keep])
+                    vectors.append(np.asarray(segment.vectors)[keep])
+                if chunks:
+                    merged.append(Segment.write(directory, name, chunks, np.vstack(vectors), np.concatenate(ids)))
+                else:
+                    merged.append(None)
+
+            if compact:
+                live = [segment for segment in merged if segment is not None]
+                snapshot_rows = sum(len(segment) for segment in live)
+                if live:
+                    index = build_index(np.vstack([np.asarray(s.vectors) for s in live]),
+                                        np.concatenate([np.asarray(s.ids) for s in live]))
+                else:
+                    index = None
+
+            snapshot_name = None
+            if index is not None:
+                with self._lock:
+                    snapshot_name = f"{self._reserve_name('index')}.faiss"
+                snapshot_file = os.path.join(directory, snapshot_name)
+                faiss.write_index(index, f"{snapshot_file}.tmp")
+                os.replace(f"{snapshot_file}.tmp", snapshot_file)
+
+            with self._lock:
+                new_files = [f for segment in merged if segment is not None for f in Segment.files(directory, segment.name)]
+                if snapshot_name:
+                    new_files.append(os.path.join(directory, snapshot_name))
+                if self.path != path or self.manifest["generation"] != generation or not self._owns(path):
+                    # The store was replaced while merging; discard our work
+                    self._remove_files(new_files)
+                    return
+
+                obsolete = []
+                for segment, run in zip(merged, runs):
+                    names = [s.name for s in run]
+                    first = next(i for i, s in enumerate(self.segments) if s.name == names[0])
+                    self.segments[first:first + len(run)] = [segment] if segment is not None else []
+                    obsolete.extend(f for name in names for f in Segment.files(directory, name))
+                if compact:
+                    # Compacted ids are physically gone; deletions made meanwhile stay tombstoned
+                    self.tombstones -= dead
+                    obsolete.extend(self._write_tombstones(directory))
+                    if index is None and self.manifest["index"]:
+                        obsolete.append(os.path.join(directory, self.manifest["index"]["file"]))
+                        self.manifest["index"] = None
+                if snapshot_name:
+                    if self.manifest["index"]:
+                        obsolete.append(os.path.join(directory, self.manifest["index"]["file"]))
+                    self.manifest["index"] = {"file": snapshot_name, "rows": snapshot_rows}
+
+                self.manifest["segments"] = [{"name": s.name, "rows": len(s)} for s in self.segments]
+                self._reindex()
+                self._write_manifest()
+                self._remove_files(obsolete)
+                print(f"Segment merge complete: {len(self.segments)} segment(s), snapshot covers {self.snapshot_rows} rows"
+                      + (f", compacted {len(dead)} deleted chunk(s)" if compact else ""))
+        except Exception as e:
+            print(f"Error merging segments: {e}")
+            import traceback
+            traceback.print_exc()
@@ -0,0 +1,129 @@
+import threading
+import time
+import numpy as np
+import sys
+import os
+from typing import Dict, Any, Optional
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from config.config import config
+from .model_registry import model_registry
+
+class Warmup:
+    """
+    Background pre-warming of the embedding model and the saved FAISS index.
+
+    start() launches one daemon thread per process that loads the shared
+    model and its tokenizer, runs the first forward pass (which triggers
+    PyTorch's lazy kernel initialisation) and opens the saved index so its
+    pages are resident. Stores using the warmed model call wait() before
+    their first encode and block on the readiness event instead of paying
+    the cold start themselves.
+    """
+
+    # Mixed lengths so the first forward pass exercises padding like real batches
+    WARMUP_TEXTS = [
+        "What is this website about?",
+        "Summarize the main services, pricing and contact details described on the page.",
+        "warm-up " * 64,
+    ]
+
+    def __init__(self):
+        self.ready = threading.Event()
+        self.timings: Dict[str, float] = {}
+        self.error: Optional[Exception] = None
+        self._key = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self, model_name: str = None, device: str = None, index_path: str = None) -> bool:
+        """
+        Start warming up in the background; later calls are no-ops.
+
+        Args:
+            model_name: Embedding model to load (defaults to Config.EMBEDDING_MODEL)
+            device: Device to load it on (defaults to Config.EMBEDDING_DEVICE)
+            index_path: Saved index to open, if any
+
+        Returns:
+            bool: True if this call started the warm-up
+        """
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self._key = (model_name or config.EMBEDDING_MODEL, device or config.EMBEDDING_DEVICE)
+            self._thread = threading.Thread(
+                target=self._run, args=(*self._key, index_path), name="warmup", daemon=True
+            )
+            self._thread.start()
+        return True
+
+    def _run(self, model_name: str, device: str, index_path: Optional[str]):
+        started = time.perf_counter()
+        try:
+            step = time.perf_counter()
+            model = model_registry.get_model(model_name, device)
+            self.timings["model_load"] = time.perf_counter() - step
+
+            step = time.perf_counter()
+            model.tokenize(self.WARMUP_TEXTS)
+            self.timings["tokenizer"] = time.perf_counter() - step
+
+            step = time.perf_counter()
+            model.encode(self.WARMUP_TEXTS, device=device, show_progress_bar=False)
+            self.timings["first_forward"] = time.perf_counter() - step
+
+            if index_path:
+                step = time.perf_counter()
+                self._warm_index(model_name, device, index_path)
+                self.timings["index_load"] = time.perf_counter() - step
+
+            self.timings["total"] = time.perf_counter() - started
+            print(f"Warm-up complete in {self.timings['total']:.2f}s: "
+                  + ", ".join(f"{name}={seconds:.2f}s" for name, seconds in self.timings.items() if name != "total"))
+        except Exception as e:
+            self.error = e
+            self.timings["total"] = time.perf_counter() - started
+            print(f"Warm-up failed after {self.timings['total']:.2f}s: {e}")
+        finally:
+            self.ready.set()
+
+    @staticmethod
+    def _warm_index(model_name: str, device: str, index_path: str):
+        """Open the saved index and run one search so its mapped pages are read in."""
+        # Imported here because FAISSStore itself waits on this module
+        from .faiss_store import FAISSStore
+        store = FAISSStore(model_name=model_name, index_path=index_path, device=device)
+        store.load_index()
+        if store.index is not None and store.index.ntotal:
+            store.index.search(np.zeros((1, store.index.d), dtype=np.float32), 1)
+
+    def wait(self, model_name: str, device: str, timeout: float = None) -> bool:
+        """
+        Block until a running warm-up of this model has finished.
+
+        Returns immediately if no warm-up was started or it warms a different model.
+
+        Returns:
+            bool: False if the timeout expired first
+        """
+        if self._thread is None or self._key != (model_name, device):
+            return True
+        if timeout is None:
+            timeout = config.WARMUP_TIMEOUT
+        return self.ready.wait(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the warm-up state ("idle", "warming", "ready" or "failed") and step timings in seconds."""
+        if self._thread is None:
+            state = "idle"
+        elif not self.ready.is_set():
+            state = "warming"
+        else:
+            state = "failed" if self.error else "ready"
+        return {
+            "state": state,
+            "timings": dict(self.timings),
+            "error": str(self.error) if self.error else None
+        }
+
+warmup = Warmup()